@@ -0,0 +1,385 @@
+"""Benchmarks for the DCS-BIOS and DCS-INSIGHT hot paths.
+
+Runs against a generated DCS-BIOS JSON fixture, or a real DCS-BIOS JSON
+directory with ``--json-dir``, and prints the results as JSON so runs of
+different versions can be compared::
+
+    python benchmarks/bench.py --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dcs_link import DCSLink, LinkConfig  # noqa: E402
+from dcs_link.bios.handler import DataHandler  # noqa: E402
+from dcs_link.bios.loader import JsonLoader  # noqa: E402
+from dcs_link.bios.protocol import ProtocolParser  # noqa: E402
+from dcs_link.config import NetworkConfig  # noqa: E402
+from dcs_link.emulator import BiosEmulator, InsightEmulator  # noqa: E402
+
+FIXTURE_AIRCRAFT = "BenchJet"
+
+# Metric name suffixes compared by --compare: rates are better higher, times lower
+HIGHER_IS_BETTER = ("_per_s",)
+LOWER_IS_BETTER = ("_ns", "_us", "_ms", "_per_word", "_per_frame")
+
+
+def _control(identifier: str, category: str, outputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "category": category, "control_type": "display", "description": identifier,
+        "identifier": identifier, "inputs": [], "outputs": outputs
+    }
+
+
+def _integer(address: int, mask: int, shift: int) -> Dict[str, Any]:
+    return {"address": address, "mask": mask, "shift_by": shift, "max_value": mask >> shift,
+            "suffix": "", "type": "integer", "description": ""}
+
+
+def _string(address: int, length: int) -> Dict[str, Any]:
+    return {"address": address, "max_length": length, "suffix": "", "type": "string", "description": ""}
+
+
+def make_fixture(json_dir: str, integers: int = 1500, strings: int = 60):
+    """Write a DCS-BIOS JSON directory with one aircraft of the given size.
+
+    Integer outputs are packed four to a word like switch positions, and
+    strings follow them, so the address layout resembles a real module.
+    """
+    os.makedirs(json_dir, exist_ok=True)
+    modules = {
+        "AircraftAliases": {"": ["CommonData"], FIXTURE_AIRCRAFT: ["CommonData", FIXTURE_AIRCRAFT]},
+        "MetadataStart": {"MetadataStart": {"_ACFT_NAME": _control("_ACFT_NAME", "Metadata", [_string(0x0000, 24)])}},
+        "MetadataEnd": {"MetadataEnd": {
+            "_UPDATE_COUNTER": _control("_UPDATE_COUNTER", "Metadata", [_integer(0xFFFE, 0x00FF, 0)]),
+            "_UPDATE_SKIP_COUNTER": _control("_UPDATE_SKIP_COUNTER", "Metadata", [_integer(0xFFFE, 0xFF00, 8)]),
+        }},
+        "CommonData": {"Common": {
+            "PILOTNAME": _control("PILOTNAME", "Common", [_string(0x0420, 24)]),
+            "ALT_MSL_FT": _control("ALT_MSL_FT", "Common", [_integer(0x0440, 0xFFFF, 0)]),
+        }},
+    }
+
+    categories: Dict[str, Dict[str, Any]] = {}
+    address = 0x1000
+    for i in range(integers):
+        shift = 4 * (i % 4)
+        identifier = f"INT_{i}"
+        categories.setdefault(f"Panel {i // 50}", {})[identifier] = _control(
+            identifier, f"Panel {i // 50}", [_integer(address + 2 * (i // 4), 0xF << shift, shift)]
+        )
+    address += 2 * ((integers + 3) // 4)
+    for i in range(strings):
+        identifier = f"STR_{i}"
+        categories.setdefault("Displays", {})[identifier] = _control(identifier, "Displays", [_string(address, 16)])
+        address += 16
+    modules[FIXTURE_AIRCRAFT] = categories
+
+    for name, module in modules.items():
+        with open(os.path.join(json_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(module, f)
+
+
+def _best(func: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of ``repeat`` runs, the least noisy estimate of the cost."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    def pick(q: float) -> float:
+        return round(samples[min(len(samples) - 1, int(q * len(samples)))], 1)
+    return {"p50_us": pick(0.5), "p90_us": pick(0.9), "p99_us": pick(0.99), "max_us": round(samples[-1], 1),
+            "samples": len(samples)}
+
+
+def _frames(json_dir: str, aircraft: Optional[str], count: int, density: float) -> List[bytes]:
+    emulator = BiosEmulator(json_dir, aircraft, change_density=density, seed=1, log_level=logging.WARNING)
+    frames = [emulator.step() for _ in range(count + 1)]
+    return frames[1:]  # The first frame is a full image
+
+
+def bench_parse(json_dir: str, aircraft: Optional[str], repeat: int) -> Dict[str, Any]:
+    frames = _frames(json_dir, aircraft, 500, 0.05)
+    stream = b"".join(frames)
+    results: Dict[str, Any] = {"frames": len(frames), "bytes": len(stream)}
+
+    def run(parser: ProtocolParser, chunks: List[bytes]):
+        for chunk in chunks:
+            parser.feed_bytes(chunk)
+
+    blocks = ProtocolParser(on_block_write=lambda address, words: None)
+    results["datagrams_bytes_per_s"] = round(len(stream) / _best(lambda: run(blocks, frames), repeat))
+    results["stream_bytes_per_s"] = round(len(stream) / _best(lambda: run(blocks, [stream]), repeat))
+    words = ProtocolParser(on_data_write=lambda address, data: None)
+    results["per_word_callback_bytes_per_s"] = round(len(stream) / _best(lambda: run(words, frames), repeat))
+    return results
+
+
+def bench_dispatch(json_dir: str, aircraft: Optional[str], repeat: int) -> Dict[str, Any]:
+    frames = _frames(json_dir, aircraft, 200, 0.05)
+    loader = JsonLoader(json_dir)
+    loader.load_metadata()
+    loader.load_aircraft(aircraft or FIXTURE_AIRCRAFT)
+    identifiers = sorted(loader.controls)
+
+    # Count the words once so the cost can be reported per word written
+    written = [0]
+    counter = ProtocolParser(on_block_write=lambda address, words: written.__setitem__(0, written[0] + len(words)))
+    for frame in frames:
+        counter.feed_bytes(frame)
+    results: Dict[str, Any] = {"frames": len(frames), "words": written[0]}
+
+    for count in sorted({1, 10, 100, 1000, len(identifiers)}):
+        if count > len(identifiers):
+            continue
+        handler = DataHandler()
+        handler.update_handler(loader.controls)
+        step = len(identifiers) / count
+        for i in range(count):
+            handler.subscribe(identifiers[int(i * step)])
+        calls = [0]
+        def on_value(bios_code: str, value: Any):
+            calls[0] += 1
+        handler.on_value = on_value
+        parser = ProtocolParser(on_block_write=handler.handle_block)
+
+        def run():
+            for frame in frames:
+                parser.feed_bytes(frame)
+                handler.end_frame()
+        elapsed = _best(run, repeat)
+        results[f"subscribed_{count}"] = {
+            "ns_per_word": round(elapsed * 1e9 / written[0], 1),
+            "us_per_frame": round(elapsed * 1e6 / len(frames), 2),
+            "callbacks_per_frame": round(calls[0] / repeat / len(frames), 1),
+        }
+
+    handler = DataHandler()
+    handler.update_handler(loader.controls)
+    for identifier in identifiers:
+        handler.subscribe(identifier)
+    handler.on_value = lambda bios_code, value: None
+    words = ProtocolParser(on_data_write=handler.handle_data)
+    def run_words():
+        for frame in frames:
+            words.feed_bytes(frame)
+            handler.end_frame()
+    results["handle_data_ns_per_word"] = round(_best(run_words, repeat) * 1e9 / written[0], 1)
+    return results
+
+
+def bench_load(json_dir: str, aircraft: Optional[str], repeat: int) -> Dict[str, Any]:
+    aircraft = aircraft or FIXTURE_AIRCRAFT
+    results: Dict[str, Any] = {"aircraft": aircraft}
+
+    def load(cache_dir: Optional[str]) -> JsonLoader:
+        loader = JsonLoader(json_dir, cache_dir)
+        loader.load_metadata()
+        loader.load_aircraft(aircraft)
+        return loader
+
+    results["controls"] = len(load(None).controls)
+    results["no_cache_ms"] = round(_best(lambda: load(None), repeat) * 1e3, 2)
+
+    cold = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            start = time.perf_counter()
+            load(cache_dir)
+            cold.append(time.perf_counter() - start)
+    results["cold_cache_ms"] = round(min(cold) * 1e3, 2)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        load(cache_dir)
+        results["warm_cache_ms"] = round(_best(lambda: load(cache_dir), repeat) * 1e3, 2)
+    return results
+
+
+async def _latency(json_dir: str, aircraft: Optional[str], mode: str, samples: int) -> Dict[str, Any]:
+    network = NetworkConfig()
+    emulator = BiosEmulator(json_dir, aircraft, network, change_density=0.05, seed=1, log_level=logging.WARNING)
+    loader = JsonLoader(json_dir)
+    loader.load_metadata()
+    loader.load_aircraft(emulator.aircraft_name)
+    # A full-word integer can carry a distinct probe value in every frame
+    probe = next(
+        identifier for identifier, control in sorted(loader.controls.items())
+        if any(o.get('type') == 'integer' and o.get('mask') == 0xFFFF for o in control.get('outputs', []))
+        and not identifier.startswith('_')
+    )
+
+    config = LinkConfig(json_dir=json_dir, cache_enable=False, log_enable=False, receive_mode=mode, network=network)
+    bios, _ = DCSLink(config)
+    sent: Dict[int, int] = {}
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    def on_probe(value: int):
+        start = sent.pop(value, None)
+        if start is not None:
+            latencies.append((time.perf_counter_ns() - start) / 1e3)
+            if len(latencies) >= samples:
+                done.set()
+    bios.on(probe, on_probe)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target = (network.multicast_group, network.receive_port)
+
+    async def send():
+        # Full image first so the client learns the aircraft
+        sock.sendto(emulator.step(), target)
+        value = 0
+        while not done.is_set():
+            value = (value + 1) & 0xFFFF
+            emulator.set_value(probe, value)
+            frame = emulator.step()
+            sent[value] = time.perf_counter_ns()
+            sock.sendto(frame, target)
+            await asyncio.sleep(0.002)
+
+    sender = asyncio.get_event_loop().create_task(send())
+    try:
+        if not await bios.connect(timeout=5):
+            return {"error": "no frames received"}
+        await asyncio.wait_for(done.wait(), 30)
+    finally:
+        sender.cancel()
+        bios.close()
+        sock.close()
+    return _percentiles(latencies[-samples:])
+
+
+def bench_latency(json_dir: str, aircraft: Optional[str], samples: int) -> Dict[str, Any]:
+    return {mode: asyncio.run(_latency(json_dir, aircraft, mode, samples)) for mode in ("asyncio", "thread")}
+
+
+async def _insight(calls: int) -> Dict[str, Any]:
+    network = NetworkConfig()
+    server = InsightEmulator(network, seed=1, log_level=logging.WARNING)
+    await server.start()
+    _, insight = DCSLink(LinkConfig(json_dir=".", cache_enable=False, log_enable=False, network=network))
+    try:
+        if not await insight.connect(timeout=5):
+            return {"error": "no API list received"}
+
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(calls):
+            call_start = time.perf_counter_ns()
+            await insight.call("LoGetModelTime()")
+            latencies.append((time.perf_counter_ns() - call_start) / 1e3)
+        elapsed = time.perf_counter() - start
+    finally:
+        insight.close()
+        server.close()
+    return {"calls_per_s": round(calls / elapsed, 1), **_percentiles(latencies)}
+
+
+def bench_insight(calls: int) -> Dict[str, Any]:
+    return asyncio.run(_insight(calls))
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a line for every numeric metric that got worse than ``tolerance``."""
+    regressions = []
+
+    def walk(new: Any, old: Any, path: str):
+        if isinstance(new, dict) and isinstance(old, dict):
+            for key in new.keys() & old.keys():
+                walk(new[key], old[key], f"{path}.{key}" if path else key)
+        elif isinstance(new, (int, float)) and isinstance(old, (int, float)) and old > 0:
+            if path.endswith(HIGHER_IS_BETTER):
+                ratio = old / new if new > 0 else float("inf")
+            elif path.endswith(LOWER_IS_BETTER) and not path.endswith("callbacks_per_frame"):
+                ratio = new / old
+            else:
+                return  # Sizes and counts describe the run
+            if ratio > 1 + tolerance:
+                regressions.append(f"{path}: {old} -> {new} ({(ratio - 1) * 100:.0f}% worse)")
+
+    walk(results["benchmarks"], baseline.get("benchmarks", {}), "")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DCS-Link and write the results as JSON.")
+    parser.add_argument("--json-dir", help="DCS-BIOS JSON directory, a generated fixture by default")
+    parser.add_argument("--aircraft", help=f"aircraft to benchmark, {FIXTURE_AIRCRAFT} for the fixture")
+    parser.add_argument("--only", nargs="+", choices=("parse", "dispatch", "load", "latency", "insight"),
+                        help="benchmarks to run, all by default")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best one is kept")
+    parser.add_argument("--samples", type=int, default=1000, help="latency samples and Insight calls")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    parser.add_argument("--compare", help="results file to compare against; exits with 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before a regression, 0.10 = 10%%")
+    args = parser.parse_args()
+
+    only = set(args.only or ("parse", "dispatch", "load", "latency", "insight"))
+    with tempfile.TemporaryDirectory() as fixture:
+        json_dir = args.json_dir
+        if not json_dir:
+            json_dir = fixture
+            make_fixture(json_dir)
+
+        benchmarks: Dict[str, Any] = {}
+        if "parse" in only:
+            benchmarks["parse"] = bench_parse(json_dir, args.aircraft, args.repeat)
+        if "dispatch" in only:
+            benchmarks["dispatch"] = bench_dispatch(json_dir, args.aircraft, args.repeat)
+        if "load" in only:
+            benchmarks["load"] = bench_load(json_dir, args.aircraft, args.repeat)
+        if "latency" in only:
+            benchmarks["latency"] = bench_latency(json_dir, args.aircraft, args.samples)
+        if "insight" in only:
+            benchmarks["insight"] = bench_insight(args.samples)
+
+    try:
+        from importlib.metadata import version
+        package_version = version("dcs_link")
+    except Exception:
+        package_version = "unknown"
+
+    results = {
+        "version": package_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "fixture": args.json_dir or "generated",
+        "benchmarks": benchmarks,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
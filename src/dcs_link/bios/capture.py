@@ -0,0 +1,131 @@
+import asyncio
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+CAPTURE_MAGIC = b'DCSLREC\x00'
+CAPTURE_VERSION = 1
+
+_FILE_HEADER = struct.Struct('<8sH')
+# monotonic receive time in nanoseconds, datagram length
+_RECORD_HEADER = struct.Struct('<qI')
+
+
+class Recorder:
+    """Append raw DCS-BIOS datagrams with monotonic timestamps to a capture file.
+
+    The file starts with a small header, followed by one record per datagram:
+    a little-endian ``int64`` timestamp from ``time.monotonic_ns()``, a
+    ``uint32`` length and the datagram bytes. Recording into an existing
+    capture appends to it. ``write`` may be called from any thread.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.datagrams = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(_FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION))
+
+    def write(self, data: bytes, timestamp: Optional[int] = None):
+        header = _RECORD_HEADER.pack(time.monotonic_ns() if timestamp is None else timestamp, len(data))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(header)
+            self._file.write(data)
+            self.datagrams += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(timestamp_ns, datagram)`` pairs from a capture file via mmap."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _FILE_HEADER.size:
+            raise ValueError(f"Not a DCS-Link capture file: {path}")
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version = _FILE_HEADER.unpack_from(mm, 0)
+            if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+                raise ValueError(f"Not a DCS-Link capture file: {path}")
+
+            pos = _FILE_HEADER.size
+            end = len(mm)
+            while pos + _RECORD_HEADER.size <= end:
+                timestamp, length = _RECORD_HEADER.unpack_from(mm, pos)
+                pos += _RECORD_HEADER.size
+                if pos + length > end:
+                    break  # Truncated by an interrupted recording
+                yield timestamp, mm[pos:pos + length]
+                pos += length
+
+
+class ReplaySource:
+    """Play a capture file back in place of the DCS-BIOS UDP socket.
+
+    Args:
+        path: Capture file written by ``Recorder``
+        speed: Playback speed relative to the recording, 1.0 for real time;
+            0 replays as fast as possible
+        batch_size: Datagrams handed over per batch when replaying as fast as possible
+    """
+    def __init__(self, path: str, speed: float = 1.0, batch_size: int = 64):
+        if speed < 0:
+            raise ValueError("speed must not be negative")
+
+        self.path = path
+        self.speed = speed
+        self.batch_size = batch_size
+        self.datagrams = 0
+        self.finished = asyncio.Event()
+
+    async def run(self, on_datagrams: Callable[[List[bytes]], None]):
+        """Replay the capture, calling ``on_datagrams`` with batches of datagrams."""
+        self.finished.clear()
+        try:
+            if self.speed:
+                await self._run_timed(on_datagrams)
+            else:
+                await self._run_fast(on_datagrams)
+        finally:
+            self.finished.set()
+
+    async def _run_fast(self, on_datagrams: Callable[[List[bytes]], None]):
+        batch: List[bytes] = []
+        for _, data in read_capture(self.path):
+            batch.append(data)
+            if len(batch) >= self.batch_size:
+                self._deliver(on_datagrams, batch)
+                batch = []
+                await asyncio.sleep(0)
+        if batch:
+            self._deliver(on_datagrams, batch)
+
+    async def _run_timed(self, on_datagrams: Callable[[List[bytes]], None]):
+        loop = asyncio.get_event_loop()
+        first: Optional[int] = None
+        start = loop.time()
+        batch: List[bytes] = []
+        for timestamp, data in read_capture(self.path):
+            if first is None:
+                first = timestamp
+            due = start + (timestamp - first) / 1e9 / self.speed
+            if batch and due > loop.time():
+                self._deliver(on_datagrams, batch)
+                batch = []
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            batch.append(data)
+        if batch:
+            self._deliver(on_datagrams, batch)
+
+    def _deliver(self, on_datagrams: Callable[[List[bytes]], None], batch: List[bytes]):
+        self.datagrams += len(batch)
+        on_datagrams(batch)
@@ -1,18 +1,42 @@
 import asyncio
+import fnmatch
+import logging
+import re
 import socket
 import struct
-from typing import Optional, Dict, Any, Callable, Set, Tuple
+import sys
+import time
+from typing import Optional, Dict, Any, Callable, List, Sequence, Set, Tuple
 from pathlib import Path
 from platform import system
 
 from ..config import LinkConfig
 from ..logger import Logger
+from ..metrics import Metrics, log_metrics
+from .capture import Recorder, ReplaySource
 from .protocol import ProtocolParser
 from .handler import DataHandler
 from .loader import JsonLoader
+from .receiver import DatagramReceiver, ThreadedReceiver
+from .sampler import Sampler
+from .sender import CommandSender
+from .series import SeriesRecorder
+from .shared import SharedExport, SharedReader
+from .subscription import Subscription
 
-class BiosClient:    
-    def __init__(self, config: LinkConfig):
+_IP_MULTICAST_ALL = getattr(socket, 'IP_MULTICAST_ALL', 49)  # Linux only, missing from older socket modules
+
+class BiosClient:
+    """Client for interacting with DCS-BIOS.
+
+    Args:
+        config: Link configuration
+        modules: Compiled JSON modules shared with other clients, see ``JsonLoader``
+    """
+    MAX_RECEIVE_BATCH = 64  # datagrams drained from the socket per wakeup
+    MAX_SAMPLERS = 32  # compiled control lists kept for snapshot()
+
+    def __init__(self, config: LinkConfig, modules: Optional[Dict[str, Dict[str, Any]]] = None):
         self._config = config
         self._logger = Logger(self.__class__.__name__, self._config.log_level if self._config.log_enable else 50)
 
@@ -21,20 +45,47 @@ class BiosClient:
             raise FileNotFoundError("Could not find DCS-BIOS JSON directory")
         
         self._listen_sock: Optional[socket.socket] = None
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._receiver: Optional[ThreadedReceiver] = None
+        self._source_task: Optional[asyncio.Task] = None
+        self._shared_reader: Optional[SharedReader] = None
+        self._hub: Optional[SharedExport] = None
+        self._recorder: Optional[Recorder] = None
+        self._overruns = 0
+        self._metrics: Optional[Metrics] = Metrics() if self._config.metrics_enable else None
+        self._metrics_task: Optional[asyncio.Task] = None
+        self._metrics_overruns = 0
         self._send_sock: Optional[socket.socket] = None
+        self._send_transport: Optional[asyncio.DatagramTransport] = None
+        self._sender: Optional[CommandSender] = (
+            CommandSender(self._send_datagram, self._config.send_max_rate) if self._config.send_queue else None
+        )
         self._received: asyncio.Event = asyncio.Event()
         self._running = False
         
-        self._loader = JsonLoader(self._json_dir)
+        # No file I/O here; definitions are loaded in an executor by connect()
+        self._loader = JsonLoader(
+            self._json_dir, self._config.cache_path() if self._config.cache_enable else None,
+            modules, self._config.aircraft_cache_size
+        )
         self._data_handler = DataHandler()
-        self._data_handler.update_handler(self._loader.address_lookup)
+        self._data_handler.subscribe("_ACFT_NAME")
+        self._controls_loaded = False
+        self._switch_task: Optional[asyncio.Task] = None
+        self._backlog: Optional[List[Any]] = None  # datagrams, or frame deltas in thread mode
 
-        self._event_handlers: Dict[str, Callable] = {}
+        self._event_handlers: Dict[str, Tuple[Subscription, ...]] = {}
+        self._groups: Dict[Tuple[str, str], List[Tuple[Callable, Dict[str, Any], Dict[str, Subscription]]]] = {}
         self._data_handler.on_value = self._on_value_from_handler
-        self._protocol_parser = ProtocolParser(self._data_handler.handle_data)
+        self._protocol_parser = ProtocolParser(
+            on_block_write=self._data_handler.handle_block,
+            on_frame_sync=self._data_handler.end_frame
+        )
         
         self.aircraft_name: Optional[str] = None
         self._events_cache: Optional[Set[str]] = None
+        self._samplers: Dict[Tuple[str, ...], Sampler] = {}
+        self._series: List[SeriesRecorder] = []
         
         self._logger.info("Waiting for Connection")
 
@@ -47,83 +98,596 @@ class BiosClient:
                     return str(json_dir)
 
         return ""
-                
-    async def connect(self, timeout: Optional[float] = None) -> bool:
+
+    async def connect(self, timeout: Optional[float] = None, source: Optional[ReplaySource] = None) -> bool:
         """Establish connection to DCS-BIOS.
         
         Args:
             timeout: Time to wait for connection before considering connection failed, None for no timeout
+            source: Capture to replay instead of receiving from the network, None for DCS-BIOS
         """
+        self._running = True
+        self._backlog = []
+        
+        try:
+            self._logger.debug("Starting receiver")
+            loop = asyncio.get_event_loop()
+            if self._metrics is not None and self._config.metrics_log_interval > 0 and not self._metrics_task:
+                self._metrics_task = loop.create_task(
+                    log_metrics(self._logger, self.metrics, self._config.metrics_log_interval)
+                )
+            if source is not None:
+                self._source_task = loop.create_task(source.run(self._on_datagrams))
+            elif self._config.receive_mode == "shared":
+                # A reader of a hub's export memory never listens to the network
+                self._open_send_socket()
+                self._shared_reader = SharedReader(self._config.shared_memory_name, self._config.shared_memory_poll_interval)
+                self._source_task = loop.create_task(self._follow_shared(self._shared_reader))
+            else:
+                self._open_listen_socket()
+                self._open_send_socket()
+                if self._config.receive_mode == "thread":
+                    self._receiver = ThreadedReceiver(
+                        self._listen_sock, loop, self._on_frames, self._on_receive_error, self._config.receive_ring_size
+                    )
+                    self._receiver.recorder = self._recorder
+                    # The thread gets its own metrics, so it never shares one with the loop
+                    self._receiver.metrics = Metrics() if self._metrics is not None else None
+                    self._receiver.start()
+                elif self._config.receive_mode == "asyncio":
+                    self._transport, _ = await loop.create_datagram_endpoint(
+                        lambda: DatagramReceiver(self._listen_sock, self._on_datagrams, self._on_receive_error, self.MAX_RECEIVE_BATCH),
+                        sock=self._listen_sock
+                    )
+                else:
+                    raise ValueError(f"Unknown receive mode: {self._config.receive_mode}")
+            if self._sender is not None and self._send_sock:
+                self._send_transport, _ = await loop.create_datagram_endpoint(
+                    asyncio.DatagramProtocol, sock=self._send_sock
+                )
+            if self._config.shared_memory_publish and self._shared_reader is None and self._hub is None:
+                self._hub = SharedExport(self._config.shared_memory_name)
+                self._data_handler.memory.changes = []
+
+            await self._load_controls()
+
+            await asyncio.wait_for(self._received.wait(), timeout)
+            name = self.aircraft_name
+            await self._load_controls(name)
+            self._controls_loaded = True
+            if self.aircraft_name and self.aircraft_name != name and self._switch_task is None:
+                # Another aircraft appeared while the backlog was replayed; what
+                # followed it is held for its controls
+                self._switch_task = loop.create_task(self._switch_aircraft())
+            self._logger.info(f"Connected to DCS-BIOS")
+            return True
+        except asyncio.TimeoutError:
+            self._logger.error("Connected to DCS-BIOS timeout")
+            self.close()
+            return False
+        except Exception:
+            self.close()
+            raise
+
+    def _open_listen_socket(self):
         self._listen_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         self._listen_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._listen_sock.bind((self._config.network.loopback_interface, self._config.network.receive_port))
 
         mreq = struct.pack('4sl', socket.inet_aton(self._config.network.multicast_group), socket.INADDR_ANY)
         self._listen_sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        if sys.platform.startswith('linux'):
+            # Only the joined group, when other clients listen to other groups on the same port
+            self._listen_sock.setsockopt(socket.IPPROTO_IP, _IP_MULTICAST_ALL, 0)
+        if self._config.network.receive_buffer_size:
+            self._listen_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._config.network.receive_buffer_size)
+        self._listen_sock.setblocking(False)
 
+    def _open_send_socket(self):
         self._send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         self._send_sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
-        
-        self._running = True
-        asyncio.create_task(self._listen_loop())
-        
+
+    async def _load_controls(self, aircraft_name: Optional[str] = None):
+        """Load the metadata, or an aircraft's controls, then replay what arrived meanwhile.
+
+        Definitions are read in an executor, unless the aircraft's tables are
+        still kept by the loader. The receiver keeps reading the socket during
+        the load and queues the datagrams in the backlog, so no frame is
+        dropped or handled against a half-built table.
+        """
+        if self._backlog is None:
+            self._backlog = []
+
         try:
-            await asyncio.wait_for(self._received.wait(), timeout)            
-            self._loader.load_aircraft(self.aircraft_name)
-            self._data_handler.update_handler(self._loader.address_lookup)
-            self._logger.info(f"Connected to DCS-BIOS")
-            return True
-        except asyncio.TimeoutError:
-            self._logger.error("Connected to DCS-BIOS timeout")
-            self.close()
-            return False
-            
-    async def _listen_loop(self):
-        self._logger.debug("Starting listen loop")
-        loop = asyncio.get_event_loop()
-        while self._running:
-            try:
-                data = await loop.sock_recv(self._listen_sock, 65536)
-                self._protocol_parser.feed_bytes(data)
-            except Exception as e:
-                if self._running:
-                    self._logger.error(f"Error in listen loop: {e}")
+            loop = asyncio.get_event_loop()
+            if aircraft_name is None:
+                # Reconnecting swaps the metadata back in, keeping the recent aircraft
+                if not self._loader.use_metadata():
+                    self._loader.set_metadata(await loop.run_in_executor(None, self._loader.read_metadata))
+            elif not self._loader.use_aircraft(aircraft_name):
+                modules = await loop.run_in_executor(None, self._loader.read_aircraft, aircraft_name)
+                self._loader.set_aircraft(aircraft_name, modules)
+            self._apply_controls()
+            if aircraft_name is not None:
+                # Outputs that arrived with the aircraft name were decoded against
+                # the metadata only; the next frame delivers them, strings included
+                self._data_handler.memory.touch()
+        finally:
+            self._replay_backlog()
+
+    def _apply_controls(self):
+        """Compile the subscriptions against the loader's current tables."""
+        self._data_handler.update_handler(self._loader.controls)
+        self._events_cache = None
+        self._samplers.clear()
+        if self._shared_reader is not None:
+            # Values the reader handed over before the table was built are sent again
+            self._shared_reader.resync()
+        for group in list(self._groups):
+            self._resolve_group(group)
+        for series in self._series:
+            self._rebind_series(series)
+
+    def _rebind_series(self, series: SeriesRecorder):
+        try:
+            sampler: Optional[Sampler] = Sampler(self._loader.controls, self._data_handler.memory, series.controls)
+        except KeyError:
+            sampler = None
+        if sampler is not None and sampler.strings:
+            sampler = None
+        if sampler is None and not series.paused:
+            self._logger.warning(
+                f"Paused recording {', '.join(series.controls)}: not all of them are integer controls of "
+                f"{self._loader.aircraft_name or 'the metadata'}"
+            )
+        series.rebind(sampler)
+
+    def _sampler(self, controls: Sequence[str]) -> Sampler:
+        """Compile a sampler against the current tables, saying which tables lack a control."""
+        missing = [name for name in controls if name not in self._loader.controls]
+        if missing:
+            if not self._loader.controls:
+                reason = "the controls are not loaded yet, connect first"
+            elif self._loader.aircraft_name is None:
+                reason = "only the metadata controls are loaded, no aircraft has been seen yet"
+            else:
+                reason = f"not in the controls of {self._loader.aircraft_name}"
+            raise KeyError(f"Unknown control {', '.join(missing)}: {reason}")
+        return Sampler(self._loader.controls, self._data_handler.memory, controls)
+
+    async def _switch_aircraft(self):
+        """Swap in the controls of the aircraft that appeared in the stream, staying connected."""
+        name: Optional[str] = None
+        try:
+            # Another change may arrive while an aircraft is read
+            while self.aircraft_name and self.aircraft_name != name:
+                name = self.aircraft_name
+                if not self._loader.use_aircraft(name):
+                    modules = await asyncio.get_event_loop().run_in_executor(None, self._loader.read_aircraft, name)
+                    self._loader.set_aircraft(name, modules)
+            if name is not None:
+                self._apply_controls()
+                self._reset_subscriptions()
+                # The next frame delivers every current value of the new aircraft
+                self._data_handler.memory.touch()
+                self._logger.info(f"Switched to aircraft {name}")
+        except Exception as e:
+            self._logger.error(f"Failed to load aircraft {name}: {e}")
+        finally:
+            self._switch_task = None
+            self._replay_backlog()
+
+    def _reset_subscriptions(self):
+        for subscriptions in self._event_handlers.values():
+            for subscription in subscriptions:
+                subscription.reset()
+
+    def _replay_backlog(self):
+        backlog, self._backlog = self._backlog, None
+        deltas = self._receiver is not None or self._shared_reader is not None
+        self._feed_all(backlog or [], self._apply_delta if deltas else self._feed)
+
+    def _feed_all(self, items: List[Any], feed: Callable[[Any], None]):
+        for index, item in enumerate(items):
+            if not self._running:
+                break
+            if self._backlog is not None:
+                # The aircraft name just arrived: hold the rest for its controls
+                self._backlog.extend(items[index:])
                 break
+            feed(item)
+
+        if self._hub is not None:
+            self._publish()
+
+    def _publish(self):
+        memory = self._data_handler.memory
+        changes, memory.changes = memory.changes, []
+        self._hub.publish(memory.buffer, changes)
+
+    def _feed(self, data: bytes):
+        metrics = self._metrics
+        if metrics is None:
+            self._protocol_parser.feed_bytes(data)
+            # DCS-BIOS sends each frame as one datagram, so its end closes the
+            # frame too; waiting for the next sync would delay values a frame
+            self._data_handler.end_frame()
+            if self._series:
+                self._capture_series()
+            return
+
+        start = time.perf_counter()
+        self._protocol_parser.feed_bytes(data)
+        decoded = time.perf_counter()
+        self._data_handler.end_frame()
+        if self._series:
+            self._capture_series()
+        metrics.observe('decode_us', (decoded - start) * 1e6)
+        metrics.observe('dispatch_us', (time.perf_counter() - decoded) * 1e6)
+        metrics.count('frames')
+
+    def _apply_delta(self, delta: Tuple[Tuple[int, bytes], ...]):
+        metrics = self._metrics
+        if metrics is None:
+            self._data_handler.apply_delta(delta)
+            if self._series:
+                self._capture_series()
+            return
+
+        start = time.perf_counter()
+        self._data_handler.apply_delta(delta)
+        if self._series:
+            self._capture_series()
+        metrics.observe('dispatch_us', (time.perf_counter() - start) * 1e6)
+        metrics.count('frames')
+
+    def _capture_series(self):
+        now = time.time()
+        for series in self._series:
+            series.capture(now)
+
+    def _on_datagrams(self, batch: List[bytes]):
+        if self._recorder:
+            timestamp = time.monotonic_ns()
+            for data in batch:
+                self._recorder.write(data, timestamp)
+
+        if self._metrics is not None:
+            self._metrics.count('datagrams', len(batch))
+            self._metrics.count('bytes', sum(map(len, batch)))
 
-    def on(self, event_name: str, handler: Callable):
+        if self._backlog is not None:
+            self._backlog.extend(batch)
+            return
+
+        self._feed_all(batch, self._feed)
+
+    def _on_frames(self, frames: List[Tuple[Tuple[int, bytes], ...]]):
+        if self._receiver is None or not self._running:
+            return  # Drained after close(), e.g. when MISSION_ENDED closed the client
+
+        if self._receiver.overruns != self._overruns:
+            self._logger.warning(f"Receive ring overrun, {self._receiver.overruns - self._overruns} frame(s) coalesced")
+            self._overruns = self._receiver.overruns
+
+        self._on_deltas(frames)
+
+    def _on_deltas(self, frames: List[Tuple[Tuple[int, bytes], ...]]):
+        if self._backlog is not None:
+            self._backlog.extend(frames)
+            return
+
+        self._feed_all(frames, self._apply_delta)
+
+    async def _follow_shared(self, reader: SharedReader):
+        await reader.run(self._on_deltas)
+        if self._running:
+            self._logger.warning("Shared export memory closed by its hub")
+            self._source_task = None
+            self.close()
+
+    @property
+    def overruns(self) -> int:
+        """
+            Frames coalesced because the receiver thread's ring buffer was full.
+        """
+        return self._receiver.overruns if self._receiver else 0
+
+    def metrics(self, reset: bool = False) -> Dict[str, Any]:
+        """Return a snapshot of the runtime metrics, empty unless ``metrics_enable`` is set.
+
+        Counters cover datagrams, bytes and frames received, parser sync losses
+        and resyncs, ring overruns, callbacks fired, suppressed by the filters
+        or dropped from full queues, and commands and command datagrams sent. Histograms in microseconds cover
+        per-frame decode and dispatch time and every handler's execution time.
+        
+        Args:
+            reset: Start counting from zero again after taking the snapshot
+        """
+        if self._metrics is None:
+            return {}
+
+        parsers = [self._protocol_parser] + ([self._receiver.parser] if self._receiver else [])
+        receiver_metrics = self._receiver.metrics if self._receiver else None
+        if receiver_metrics is None:
+            snapshot = self._metrics.snapshot()
+        else:
+            merged = Metrics()
+            merged.update(self._metrics)
+            merged.update(receiver_metrics)
+            snapshot = merged.snapshot()
+        counters = snapshot['counters']
+        counters['sync_losses'] = sum(parser.sync_losses for parser in parsers)
+        counters['resyncs'] = sum(parser.resyncs for parser in parsers)
+        counters['overruns'] = self.overruns - self._metrics_overruns
+        if reset:
+            self._metrics.reset()
+            if receiver_metrics is not None:
+                self._receiver.metrics = Metrics()
+            for parser in parsers:
+                parser.sync_losses = parser.resyncs = 0
+            self._metrics_overruns = self.overruns
+        return snapshot
+
+    def record(self, path: str):
+        """Record every received datagram to a capture file.
+
+        The capture can be played back with ``connect(source=ReplaySource(path))``.
+        
+        Args:
+            path: Capture file to append to
+        """
+        self.stop_recording()
+        self._recorder = Recorder(path)
+        if self._receiver:
+            self._receiver.recorder = self._recorder
+        self._logger.info(f"Recording to {path}")
+
+    def stop_recording(self):
+        """Stop recording and close the capture file."""
+        recorder, self._recorder = self._recorder, None
+        if self._receiver:
+            self._receiver.recorder = None
+        if recorder:
+            recorder.close()
+            self._logger.info(f"Recorded {recorder.datagrams} datagrams to {recorder.path}")
+
+    def _on_receive_error(self, e: Exception):
+        if self._running:
+            self._logger.error(f"Error in receiver: {e}")
+
+    def on(self, event_name: str, handler: Callable, priority: int = 0, change_only: bool = True,
+           deadband: int = 0, max_rate: Optional[float] = None, mode: Optional[str] = None,
+           queue_size: int = 16, overflow: str = "drop_oldest"):
         """Register an event handler.
+
+        Several handlers can listen to the same event; registering the same
+        handler again replaces its options. ``event_name`` may be a wildcard
+        pattern such as ``"UFC_*"``, resolved once against the loaded controls;
+        pattern handlers are called with ``(event_name, value)``.
         
         Args:
-            event_name: Name of the event to listen for
-            handler: Function to call when event is emitted
+            event_name: Name or wildcard pattern of the events to listen for
+            handler: Function or coroutine function to call when event is emitted
+            priority: Handlers with a higher priority run first
+            change_only: Only call the handler when the value changes
+            deadband: Ignore integer changes no larger than this, for noisy gauges
+            max_rate: Maximum calls per second, None for no limit; the latest value is always delivered
+            mode: "inline", "task" or "thread"; defaults to "task" for coroutine functions, else "inline"
+            queue_size: Maximum values waiting for a "task" or "thread" handler
+            overflow: "drop_oldest" or "latest", what to keep when the queue is full
         """
-        if event_name not in self.events:
+        options = dict(
+            priority=priority, change_only=change_only, deadband=deadband, max_rate=max_rate,
+            mode=mode, queue_size=queue_size, overflow=overflow
+        )
+        if any(c in event_name for c in "*?["):
+            self._add_group(("pattern", event_name), handler, options)
+            return
+
+        if self._controls_loaded and event_name not in self.events:
             self._logger.warning(f"Event '{event_name}' is not supported")
 
-        self._event_handlers[event_name] = handler
+        subscription = Subscription(event_name, handler, self._handler_error, **options)
+        for previous in self._event_handlers.get(event_name, ()):
+            if previous.group is None and previous.handler == handler:
+                self._remove_subscription(previous)
+                break
+
+        self._add_subscription(subscription)
         self._logger.debug(f"Registered handler for event: {event_name}")
 
-    def off(self, event_name: str):
-        """Unregister an event handler.
+    def on_category(self, category: str, handler: Callable, **options):
+        """Register a handler for every control of a DCS-BIOS category.
+
+        The handler is called with ``(event_name, value)`` and accepts the same
+        options as ``on()``.
+
+        Args:
+            category: Category name as found in the DCS-BIOS JSON files
+            handler: Function or coroutine function to call when event is emitted
+        """
+        self._add_group(("category", category), handler, options)
+
+    def off(self, event_name: str, handler: Optional[Callable] = None):
+        """Unregister event handlers.
         
         Args:
-            event_name: Name of the event to unregister
+            event_name: Name or wildcard pattern passed to ``on()``
+            handler: Handler to remove, None to remove all handlers of the event
         """
-        if event_name in self.events and event_name in self._event_handlers:
-            self._event_handlers.pop(event_name)
+        if any(c in event_name for c in "*?["):
+            self._remove_group(("pattern", event_name), handler)
+            return
+
+        for subscription in self._event_handlers.get(event_name, ()):
+            if subscription.group is None and handler in (None, subscription.handler):
+                self._remove_subscription(subscription)
+
+    def off_category(self, category: str, handler: Optional[Callable] = None):
+        """Unregister handlers added with ``on_category()``.
+
+        Args:
+            category: Category name passed to ``on_category()``
+            handler: Handler to remove, None to remove all handlers of the category
+        """
+        self._remove_group(("category", category), handler)
+
+    def _add_subscription(self, subscription: Subscription):
+        # Tuples are replaced rather than mutated, so a handler can call on()/off()
+        # while its event is being dispatched
+        subscriptions = self._event_handlers.get(subscription.event_name, ()) + (subscription,)
+        self._event_handlers[subscription.event_name] = tuple(sorted(subscriptions, key=lambda s: -s.priority))
+        subscription.metrics = self._metrics
+        self._data_handler.subscribe(subscription.event_name)
 
-    def send(self, command: str):
+    def _remove_subscription(self, subscription: Subscription):
+        subscriptions = tuple(s for s in self._event_handlers[subscription.event_name] if s is not subscription)
+        if subscriptions:
+            self._event_handlers[subscription.event_name] = subscriptions
+        else:
+            del self._event_handlers[subscription.event_name]
+        subscription.cancel()
+        self._data_handler.unsubscribe(subscription.event_name)
+
+    def _add_group(self, group: Tuple[str, str], handler: Callable, options: Dict[str, Any]):
+        # Validate the options now rather than when the first control matches
+        Subscription(group[1], handler, self._handler_error, **options)
+
+        self._remove_group(group, handler)
+        self._groups.setdefault(group, []).append((handler, options, {}))
+        self._resolve_group(group)
+        self._logger.debug(f"Registered handler for {group[0]}: {group[1]}")
+
+    def _remove_group(self, group: Tuple[str, str], handler: Optional[Callable]):
+        entries = self._groups.get(group, [])
+        for entry in [e for e in entries if handler in (None, e[0])]:
+            entries.remove(entry)
+            for subscription in entry[2].values():
+                self._remove_subscription(subscription)
+        if not entries:
+            self._groups.pop(group, None)
+
+    def _resolve_group(self, group: Tuple[str, str]):
+        """Match a pattern or category against the loaded controls once."""
+        kind, name = group
+        if kind == "pattern":
+            regex = re.compile(fnmatch.translate(name))
+            matches = {event for event in self.events if regex.match(event)}
+        else:
+            matches = self._loader.categories.get(name, set())
+
+        for handler, options, subscriptions in self._groups[group]:
+            for event_name in set(subscriptions) - matches:
+                self._remove_subscription(subscriptions.pop(event_name))
+            for event_name in matches - set(subscriptions):
+                subscription = Subscription(event_name, handler, self._handler_error, group=group, **options)
+                subscriptions[event_name] = subscription
+                self._add_subscription(subscription)
+
+    def send(self, command: str) -> Optional[asyncio.Future]:
         """Send a command to DCS-BIOS.
+
+        With ``send_queue`` the command is queued and sent with every other
+        command issued in the same event loop iteration. A later absolute
+        position of the same control replaces it when it was only a step on
+        the way, see ``CommandSender``; ``INC``, ``DEC``, ``TOGGLE`` and
+        relative commands are always sent. The returned future is done once
+        the command, or the value replacing it, has been sent.
         
         Args:
             command: Command string to send
         """
-        if self._send_sock:
-            self._send_sock.sendto(
-                command.encode('utf-8'), 
-                (self._config.network.server_ip , self._config.network.send_port)
-            )
+        if not self._send_sock:
+            return None
+
+        if self._metrics is not None:
+            self._metrics.count('commands_sent')
+        if self._sender is not None:
+            return self._sender.send(command)
+
+        self._send_datagram(command.encode('utf-8'))
+        if self._logger.enabled(logging.DEBUG):
             self._logger.debug(f"Sent command: {command}")
+        return None
+
+    def _send_datagram(self, data: bytes):
+        address = (self._config.network.server_ip, self._config.network.send_port)
+        if self._send_transport is not None:
+            self._send_transport.sendto(data, address)
+        elif self._send_sock:
+            self._send_sock.sendto(data, address)
+        else:
+            raise ConnectionError("Not connected to DCS-BIOS")
+        if self._metrics is not None:
+            self._metrics.count('command_datagrams')
+
+    async def flush(self):
+        """Wait until every queued command has been sent, including those held by a rate limit."""
+        if self._sender is not None:
+            await self._sender.flush()
+
+    def set_send_rate(self, control: str, max_rate: Optional[float]):
+        """Limit the queued commands of a control.
+
+        The control's queued commands are sent one per slot, and positions
+        issued while one waits are coalesced, so a fast knob sends at most
+        ``max_rate`` values per second. Has no effect without ``send_queue``.
+
+        Args:
+            control: Control identifier, the first word of its commands
+            max_rate: Commands per second, 0 for no limit, None for ``send_max_rate``
+        """
+        if self._sender is not None:
+            self._sender.set_rate(control, max_rate)
+
+    def snapshot(self, controls: Sequence[str], as_array: bool = False) -> Any:
+        """Read the current value of many controls at once, without subscribing to them.
+
+        The list of controls is compiled on first use and kept until the
+        aircraft's controls are reloaded, so sampling the same list again is a
+        single gather over the export memory (vectorized when NumPy is
+        installed). String controls are decoded when looked up.
+
+        Args:
+            controls: Control identifiers to read
+            as_array: Return only the integer values, in the order of ``controls``, as a NumPy
+                array (a list without NumPy) instead of a ``Snapshot`` mapping
+        """
+        key = tuple(controls)
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            if len(self._samplers) >= self.MAX_SAMPLERS:
+                del self._samplers[next(iter(self._samplers))]
+            sampler = self._samplers[key] = self._sampler(key)
+
+        snapshot = sampler.read()
+        return snapshot.array if as_array else snapshot
+
+    def record_series(self, controls: Sequence[str], capacity: int = 65536, ring: bool = True,
+                      decimate: int = 1, reduce: str = "last") -> SeriesRecorder:
+        """Record integer controls into NumPy columns, one row per export frame.
+
+        Rows are read from the export memory after every frame, without going
+        through handlers. The controls are compiled against the aircraft
+        loaded now and again whenever another one is loaded; recording pauses
+        while the loaded tables lack one of them. Requires NumPy.
+
+        Args:
+            controls: Integer controls to record
+            capacity: Rows kept in memory
+            ring: Overwrite the oldest rows once full instead of stopping
+            decimate: Frames per row
+            reduce: "last", "mean", "min" or "max", how the frames of a row are combined
+        """
+        series = SeriesRecorder(self._sampler(controls), capacity, ring, decimate, reduce)
+        self._series.append(series)
+        return series
+
+    def stop_series(self, series: SeriesRecorder):
+        """Stop recording a series; its rows stay available."""
+        if series in self._series:
+            self._series.remove(series)
 
     @property
     def events(self) -> Set[str]:
@@ -134,11 +698,8 @@ class BiosClient:
             return self._events_cache
             
         event_set = set(['MISSION_ENDED',])
-        
-        for controls_list in self._loader.address_lookup.values():
-            for control in controls_list:
-                if 'identifier' in control and control['identifier'] != "_ACFT_NAME":
-                    event_set.add(control['identifier'])
+        event_set.update(self._loader.events)
+        event_set.discard("_ACFT_NAME")
         
         self._events_cache = event_set
         return event_set
@@ -146,28 +707,47 @@ class BiosClient:
     def _on_value_from_handler(self, bios_code: str, value: Any):
         if bios_code == "_ACFT_NAME":
             if not self.aircraft_name:
-                self.aircraft_name = value
+                if not value:
+                    return  # No aircraft yet, e.g. a hub's image before its first frame
+                self._set_aircraft(value)
             elif value == "":
-                if "MISSION_ENDED" in self._event_handlers:
-                    h = self._event_handlers["MISSION_ENDED"]
-                    try:
-                        h(None)
-                    except Exception as e:
-                        self._logger.error(f" Error in event MISSION_ENDED: {h.__name__} - {e}")
+                for subscription in self._event_handlers.get("MISSION_ENDED", ()):
+                    subscription.dispatch(None)
+                # Nothing of the ended mission is delivered after MISSION_ENDED
+                self._data_handler.skip_frame()
                 
-                self.close()
+                if self._config.stay_connected:
+                    self.aircraft_name = None
+                    self._reset_subscriptions()
+                else:
+                    self.close()
+            elif value != self.aircraft_name and self._config.stay_connected:
+                self._set_aircraft(value)
             
             if not self._received.is_set(): 
                 self._received.set()
             
             return
-        
-        if bios_code in self._event_handlers:
-            h = self._event_handlers[bios_code]
-            try:
-                h(value)
-            except Exception as e:
-                self._logger.error(f"Error in event {bios_code}: {h.__name__} - {e}")
+
+        subscriptions = self._event_handlers.get(bios_code)
+        if subscriptions:
+            for subscription in subscriptions:
+                subscription.offer(value)
+
+    def _set_aircraft(self, aircraft_name: str):
+        self.aircraft_name = aircraft_name
+        # The rest of the frame was decoded with the previous controls; the new
+        # ones deliver it again once loaded
+        self._data_handler.skip_frame()
+        # Queue what follows until the aircraft's controls are loaded
+        if self._backlog is None:
+            self._backlog = []
+        if self._controls_loaded and self._switch_task is None:
+            # A new aircraft while staying connected; connect() loads the first one
+            self._switch_task = asyncio.get_event_loop().create_task(self._switch_aircraft())
+
+    def _handler_error(self, event_name: str, handler: Callable, e: Exception):
+        self._logger.error(f"Error in event {event_name}: {getattr(handler, '__name__', handler)} - {e}")
 
     def close(self):
         """
@@ -175,13 +755,63 @@ class BiosClient:
         """
         self._logger.info("Closing connection")
         self._running = False
-        if self._listen_sock:
+        self._backlog = None
+        if self._receiver:
+            self._receiver.close()
+            if self._receiver.metrics is not None:
+                self._metrics.update(self._receiver.metrics)
+            self._receiver = None
+
+        if self._source_task:
+            self._source_task.cancel()
+            self._source_task = None
+        self._shared_reader = None
+
+        if self._switch_task:
+            self._switch_task.cancel()
+            self._switch_task = None
+
+        if self._hub:
+            # Readers get the final image, then see the hub close
+            self._publish()
+            self._hub.close()
+            self._hub = None
+            self._data_handler.memory.changes = None
+
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        self._metrics_overruns = 0
+
+        self.stop_recording()
+
+        if self._transport:
+            # The transport owns the listen socket from here on
+            self._transport.close()
+            self._transport = None
+            self._listen_sock = None
+        elif self._listen_sock:
             self._listen_sock.close()
             self._listen_sock = None
 
-        if self._send_sock:
+        if self._sender is not None:
+            self._sender.close()
+
+        if self._send_transport:
+            # The transport owns the send socket from here on
+            self._send_transport.close()
+            self._send_transport = None
+            self._send_sock = None
+        elif self._send_sock:
             self._send_sock.close()
             self._send_sock = None
     
+        self._reset_subscriptions()
+
+        # The subscriptions stay registered for the next connect()
         self._protocol_parser.reset()
-        self._data_handler.reset()
\ No newline at end of file
+        self._data_handler.reset()
+        self._received.clear()
+        self._controls_loaded = False
+        self.aircraft_name = None
+        self._overruns = 0
\ No newline at end of file
@@ -1,105 +1,207 @@
-from typing import Dict, List, Any, Callable, Optional
+from bisect import bisect_left, insort
+from typing import Dict, List, Any, Callable, Optional, Sequence, Tuple
 
+from .memory import ExportMemory
 
-class IntegerParser:
-    def __init__(self, mask: int, shift: int, bios_code: str):
-        self.mask = mask
-        self.shift = shift
-        self.bios_code = bios_code
-        self.current_value: Optional[int] = None
 
-    def add_data(self, address: int, data: int):
-        val = (data & self.mask) >> self.shift
-        self.current_value = val
-
-
-class StringParser:
-    def __init__(self, address: int, length: int, bios_code: str):
-        self.base_address = address
-        self.length = length
-        self.bios_code = bios_code
-        self.buffer = bytearray(length)
-        self.filled = [False] * length
-        self.current_value: Optional[str] = None
-
-    @property
-    def data_ready(self) -> bool:
-        return all(self.filled)
-
-    def _set_character(self, index: int, b: int) -> bool:
-        if 0 <= index < self.length:
-            self.buffer[index] = b
-            self.filled[index] = True
-            return index + 1 == self.length
-        return False
-
-    def add_data(self, address: int, data: int):
-        b1 = data & 0xFF
-        b2 = (data >> 8) & 0xFF
-
-        offset = address - self.base_address
-
-        done = self._set_character(offset, b1)
-        if not done:
-            self._set_character(offset + 1, b2)
-
-        if not self.data_ready:
-            return
-
-        new_value = bytes(self.buffer).decode('utf-8', errors='ignore')
-        if new_value != self.current_value:
-            self.current_value = new_value
+class DataHandler:
+    """Dispatch values of subscribed controls from the export memory.
 
+    Only controls passed to ``subscribe`` are compiled into the dispatch table,
+    which maps a word address to ``(mask, shift, slot)`` entries. Integer
+    outputs use their own mask and shift; string outputs use a mask of 0 and
+    the shift holds the mask clearing the word's bit in ``_missing``. Per-output state
+    is kept in flat lists indexed by slot.
 
-class DataHandler:
+    A string is compared with its last raw bytes when one of its words is
+    written, and decoded only when they differ, at most once per frame.
+    """
     def __init__(self):
-        self.address_lookup: Dict[int, List[Any]] = {}
+        self.controls: Dict[str, Dict[str, Any]] = {}
         self.on_value: Optional[Callable[[str, Any], None]] = None
+        self.memory = ExportMemory()
+
+        self._table: Dict[int, List[Tuple[int, int, int]]] = {}
+        self._addresses: List[int] = []
+        self._refs: Dict[str, int] = {}
+        self._slots: Dict[str, List[int]] = {}
+        self._free: List[int] = []
+
+        # Slot columns
+        self._codes: List[Optional[str]] = []
+        self._base: List[int] = []
+        self._length: List[int] = []  # 0 for integer outputs
+        self._missing: List[int] = []  # Bit per string word not written yet
+        self._raw: List[Optional[bytearray]] = []  # Last raw bytes of string outputs
+        self._text: List[Optional[str]] = []  # and their decoded value
+        self._skip = False
+
+    def subscribe(self, bios_code: str):
+        """Add a control to the dispatch table, counting repeated subscriptions."""
+        refs = self._refs.get(bios_code, 0)
+        self._refs[bios_code] = refs + 1
+        if not refs:
+            self._slots[bios_code] = self._compile(bios_code)
+
+    def unsubscribe(self, bios_code: str):
+        """Drop one subscription, removing the control once none are left."""
+        refs = self._refs.get(bios_code, 0)
+        if refs > 1:
+            self._refs[bios_code] = refs - 1
+        elif refs:
+            del self._refs[bios_code]
+            for slot in self._slots.pop(bios_code):
+                self._release(slot)
+
+    def _compile(self, bios_code: str) -> List[int]:
+        control = self.controls.get(bios_code)
+        if not control:
+            return []
+
+        slots = []
+        for output in control.get('outputs', []):
+            address = output.get('address', 0)
+            if output.get('type') == 'integer':
+                slot = self._allocate(bios_code, address, 0)
+                self._add_entry(address, (output.get('mask', 0xFFFF), output.get('shift_by', 0), slot))
+            elif output.get('type') == 'string':
+                slot = self._allocate(bios_code, address, output.get('max_length', 1))
+                string_words = self._string_words(slot)
+                for i, addr in enumerate(string_words):
+                    self._add_entry(addr, (0, ~(1 << i), slot))
+                self._missing[slot] = (1 << len(string_words)) - 1
+            else:
+                continue
+            slots.append(slot)
+        return slots
+
+    def _allocate(self, bios_code: str, address: int, length: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._codes[slot] = bios_code
+            self._base[slot] = address
+            self._length[slot] = length
+            self._missing[slot] = 0
+            self._raw[slot] = None
+            self._text[slot] = None
+        else:
+            slot = len(self._codes)
+            self._codes.append(bios_code)
+            self._base.append(address)
+            self._length.append(length)
+            self._missing.append(0)
+            self._raw.append(None)
+            self._text.append(None)
+        return slot
+
+    def _release(self, slot: int):
+        addresses = self._string_words(slot) if self._length[slot] else (self._base[slot],)
+        for addr in addresses:
+            entries = [e for e in self._table[addr] if e[2] != slot]
+            if entries:
+                self._table[addr] = entries
+            else:
+                del self._table[addr]
+                del self._addresses[bisect_left(self._addresses, addr)]
+
+        self._codes[slot] = None
+        self._free.append(slot)
+
+    def _string_words(self, slot: int) -> range:
+        base = self._base[slot]
+        return range(base & ~1, base + self._length[slot], 2)
+
+    def _add_entry(self, address: int, entry: Tuple[int, int, int]):
+        entries = self._table.get(address)
+        if entries is None:
+            self._table[address] = [entry]
+            insort(self._addresses, address)
+        else:
+            entries.append(entry)
 
-    def _register_integer(self, address: int, mask: int, shift: int, bios_code: str):
-        parser = IntegerParser(mask, shift, bios_code)
-        self.address_lookup.setdefault(address, []).append(parser)
+    def handle_data(self, address: int, data: int):
+        self.memory.write_word(address, data)
 
-    def _register_string(self, address: int, length: int, bios_code: str):
-        parser = StringParser(address, length, bios_code)
-        for i in range(length):
-            self.address_lookup.setdefault(address + i, []).append(parser)
+    def handle_block(self, address: int, words: Sequence[int]):
+        self.memory.write(address, words)
 
-    def handle_data(self, address: int, data: int):
-        parsers = self.address_lookup.get(address)
-        if not parsers:
-            return
+    def apply_delta(self, delta: Sequence[Tuple[int, bytes]]):
+        """Write a frame delta of ``(address, bytes)`` pairs and dispatch it."""
+        for address, data in delta:
+            self.memory.write_bytes(address, data)
+        self.end_frame()
 
-        for p in parsers:
-            try:
-                p.add_data(address, data)
-            except Exception:
-                continue
+    def end_frame(self):
+        """Dispatch every subscribed control touched since the last frame boundary.
+
+        Each control is evaluated once against the memory image, however many
+        times its addresses were written during the frame. Addresses nobody
+        subscribed to are skipped by bisecting the dirty ranges.
+        """
+        if not self.memory.dirty:
+            return
 
-            if hasattr(p, 'current_value') and isinstance(p.current_value, int):
-                if self.on_value:
-                    self.on_value(p.bios_code, p.current_value)
-
-            if hasattr(p, 'data_ready') and p.data_ready:
-                value = p.current_value
-                if self.on_value and value is not None:
-                    self.on_value(p.bios_code, value.strip('\x00 \t\n\r'))
-
-    def update_handler(self, address_lookup: Dict[int, List[Any]]):
-        self.address_lookup.clear()
-        for addr, controls in address_lookup.items():
-            for control in controls:
-                for output in control.get('outputs', []):
-                    if output.get('type') == 'integer':
-                        mask = output.get('mask', 0xFFFF)
-                        shift = output.get('shift_by', 0)
-                        bios_code = control.get('identifier')
-                        self._register_integer(addr, mask, shift, bios_code)
-                    elif output.get('type') == 'string':
-                        length = output.get('max_length', 1)
-                        bios_code = control.get('identifier')
-                        self._register_string(output.get('address', addr), length, bios_code)
+        table = self._table
+        addresses = self._addresses
+        words = self.memory.words
+        missing = self._missing
+        touched: Dict[int, Optional[int]] = {}
+        for start, end in self.memory.take_dirty():
+            lo = bisect_left(addresses, start & ~1)
+            hi = bisect_left(addresses, end, lo)
+            for addr in addresses[lo:hi]:
+                data = words[addr >> 1]
+                for mask, shift, slot in table[addr]:
+                    if mask:
+                        touched[slot] = (data & mask) >> shift
+                    else:
+                        missing[slot] &= shift
+                        touched[slot] = None
+
+        buffer = self.memory.buffer
+        self._skip = False
+        for slot, value in touched.items():
+            if self._skip or not self.on_value:
+                break
+            if value is None:
+                # Strings are only reported once every character has arrived
+                if missing[slot]:
+                    continue
+                base = self._base[slot]
+                raw = buffer[base:base + self._length[slot]]
+                if raw == self._raw[slot]:
+                    value = self._text[slot]
+                else:
+                    value = raw.decode('utf-8', errors='ignore').strip('\x00 \t\n\r')
+                    self._raw[slot] = raw
+                    self._text[slot] = value
+            self.on_value(self._codes[slot], value)
+
+    def skip_frame(self):
+        """Drop the rest of the frame being dispatched, e.g. once it turns out to belong to another aircraft."""
+        self._skip = True
+
+    def update_handler(self, controls: Dict[str, Dict[str, Any]]):
+        """Replace the control definitions and recompile the subscribed controls."""
+        self.controls = controls
+        self._clear_table()
+        for bios_code in self._refs:
+            self._slots[bios_code] = self._compile(bios_code)
+
+    def _clear_table(self):
+        self._table.clear()
+        self._addresses = []
+        self._slots.clear()
+        self._free = []
+        self._codes = []
+        self._base = []
+        self._length = []
+        self._missing = []
+        self._raw = []
+        self._text = []
 
     def reset(self):
-        self.address_lookup.clear()
-        self.on_value = None
\ No newline at end of file
+        """Clear the memory and the compiled table, keeping the subscriptions for the next ``update_handler``."""
+        self._skip = True  # reset() may be called by a handler of the frame being dispatched
+        self.update_handler({})
+        self.memory.clear()
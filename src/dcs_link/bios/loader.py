@@ -1,53 +1,264 @@
+import hashlib
 import json
+import marshal
 import os
-from typing import Dict, Any, List
+import struct
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set
 
 class JsonLoader:
+    """Load DCS-BIOS control definitions, backed by a compiled on-disk cache.
+
+    Each JSON module is compiled once into its controls and event names, and
+    stored in ``cache_dir`` as a marshal payload behind a fixed header. The cache entry is reused while the source
+    file's size and mtime match, or while its content hash still matches after
+    a touch. Pass ``cache_dir=None`` to always parse the JSON.
+
+    Loaders given the same ``modules`` dict share the compiled modules, so
+    several clients flying the same aircraft compile and hold its tables once.
+
+    ``load_aircraft`` replaces the previous aircraft's controls. The merged
+    tables of the last ``max_tables`` aircraft stay built, so switching back
+    to one of them swaps its tables in without touching the disk.
+    ``address_lookup`` is only built when it is first read.
+    """
     PRELOAD_FILES = (
         "AircraftAliases.json",
         "MetadataStart.json",
         "MetadataEnd.json"
     )
-    
-    def __init__(self, json_dir: str):
+
+    CACHE_MAGIC = b'DCSLINK\x00'
+    CACHE_VERSION = 2
+    # magic, cache version, marshal version, source mtime_ns, source size, source digest
+    _CACHE_HEADER = struct.Struct('<8sHHqq16s')
+
+    _CONTROL_KEYS = ('category', 'control_type', 'description', 'identifier')
+    _OUTPUT_KEYS = ('address', 'mask', 'shift_by', 'max_value', 'max_length', 'type', 'suffix')
+
+    def __init__(self, json_dir: str, cache_dir: Optional[str] = None,
+                 modules: Optional[Dict[str, Dict[str, Any]]] = None, max_tables: int = 4):
         self.json_dir = json_dir
-        self.address_lookup: Dict[int, List[Any]] = {}
-        self._preload_files()
+        self.modules: Dict[str, Dict[str, Any]] = {} if modules is None else modules
+        self.max_tables = max_tables
+        self.cache_dir = None
+        if cache_dir:
+            digest = hashlib.sha1(os.path.abspath(json_dir).encode('utf-8')).hexdigest()[:12]
+            self.cache_dir = os.path.join(cache_dir, digest)
 
-    def _preload_files(self) -> None:
+        self.controls: Dict[str, Dict[str, Any]] = {}
+        self.events: Set[str] = set()
+        self.categories: Dict[str, Set[str]] = {}
+        self._aliases: Optional[Dict[str, List[str]]] = None
+        self._metadata: List[Dict[str, Any]] = []
+        # aircraft name -> merged tables of the metadata and its modules, least recently used first
+        self._tables: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._metadata_tables: Optional[tuple] = None
+        self.aircraft_name: Optional[str] = None
+        self._address_lookup: Optional[Dict[int, List[Any]]] = None
+
+    @property
+    def address_lookup(self) -> Dict[int, List[Any]]:
+        """Controls with an output at each address, built from the current controls on first use."""
+        if self._address_lookup is None:
+            lookup: Dict[int, List[Any]] = {}
+            for control in self.controls.values():
+                for address in dict.fromkeys(output['address'] for output in control['outputs']):
+                    lookup.setdefault(address, []).append(control)
+            self._address_lookup = lookup
+        return self._address_lookup
+
+    @property
+    def aircraft(self) -> List[str]:
+        """Aircraft names known from the aliases, empty until the metadata is read."""
+        return [name for name in self._aliases or () if name]
+
+    def read_metadata(self) -> List[Dict[str, Any]]:
+        """Read the aircraft aliases and return the compiled metadata modules.
+
+        Only touches the cache and the JSON files, so it can run in an executor.
+        """
         aliases_path = os.path.join(self.json_dir, self.PRELOAD_FILES[0])
-        
+
         with open(aliases_path, 'r', encoding='utf-8') as f:
-            self._aliases = json.load(f)
-
-        for filename in self.PRELOAD_FILES[1:]:
-            filepath = os.path.join(self.json_dir, filename)
-
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self._parse_aircraft_controls(data)
-
-    def load_aircraft(self, aircraft_name: str) -> None:                
-        for filename in self._aliases[aircraft_name if aircraft_name in self._aliases else ""]:
-            filepath = os.path.join(self.json_dir, f'{filename}.json')
-            
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self._parse_aircraft_controls(data)
-                
-    def _parse_aircraft_controls(self, json_data: Dict[str, Any]) -> None:
+            aliases = json.load(f)
+
+        modules = [self._load_module(os.path.splitext(filename)[0]) for filename in self.PRELOAD_FILES[1:]]
+        self._aliases = aliases
+        return modules
+
+    def read_aircraft(self, aircraft_name: str) -> List[Dict[str, Any]]:
+        """Return the compiled modules of an aircraft; safe to run in an executor."""
+        return [self._load_module(filename) for filename in self._module_names(aircraft_name)]
+
+    def _module_names(self, aircraft_name: str) -> List[str]:
+        return self._aliases[aircraft_name if aircraft_name in self._aliases else ""]
+
+    def add_modules(self, modules: List[Dict[str, Any]]) -> None:
+        """Merge modules into the current tables."""
+        for module in modules:
+            self._add_module(module)
+
+    def set_metadata(self, modules: List[Dict[str, Any]]) -> None:
+        """Make the metadata modules the base of every aircraft's tables, dropping any aircraft."""
+        self._metadata = modules
+        self._tables.clear()
+        self.aircraft_name = None
+        self._new_tables()
+        self.add_modules(modules)
+        self._metadata_tables = self._current_tables()
+
+    def use_metadata(self) -> bool:
+        """Swap in the metadata-only tables, keeping the recent aircraft; False if the metadata was never read."""
+        if self._metadata_tables is None:
+            return False
+
+        self.controls, self.events, self.categories = self._metadata_tables
+        self._address_lookup = None
+        self.aircraft_name = None
+        return True
+
+    def set_aircraft(self, aircraft_name: str, modules: List[Dict[str, Any]]) -> None:
+        """Replace the current aircraft with ``modules`` read by ``read_aircraft``."""
+        self._new_tables()
+        self.add_modules(self._metadata)
+        self.add_modules(modules)
+        self.aircraft_name = aircraft_name
+        self._tables[aircraft_name] = self._current_tables()
+        self._tables.move_to_end(aircraft_name)
+        while len(self._tables) > max(self.max_tables, 1):
+            evicted, _ = self._tables.popitem(last=False)
+            # Forget the compiled modules no kept aircraft uses
+            in_use = {name for kept in self._tables for name in self._module_names(kept)}
+            for name in set(self._module_names(evicted)) - in_use:
+                self.modules.pop(name, None)
+
+    def use_aircraft(self, aircraft_name: str) -> bool:
+        """Swap in the tables of a recently used aircraft, returning False if they are not kept."""
+        tables = self._tables.get(aircraft_name)
+        if tables is None:
+            return False
+
+        self._tables.move_to_end(aircraft_name)
+        self.controls, self.events, self.categories = tables
+        self._address_lookup = None
+        self.aircraft_name = aircraft_name
+        return True
+
+    def _new_tables(self) -> None:
+        self.controls = {}
+        self.events = set()
+        self.categories = {}
+        self._address_lookup = None
+
+    def _current_tables(self) -> tuple:
+        return self.controls, self.events, self.categories
+
+    def load_metadata(self) -> None:
+        self.set_metadata(self.read_metadata())
+
+    def load_aircraft(self, aircraft_name: str) -> None:
+        if not self.use_aircraft(aircraft_name):
+            self.set_aircraft(aircraft_name, self.read_aircraft(aircraft_name))
+
+    def _load_module(self, name: str) -> Dict[str, Any]:
+        module = self.modules.get(name)
+        if module is not None:
+            return module
+
+        filepath = os.path.join(self.json_dir, f'{name}.json')
+        module = self._read_cache(name, filepath)
+        if module is None:
+            with open(filepath, 'rb') as f:
+                source = f.read()
+            module = self._compile_module(json.loads(source.decode('utf-8')))
+            self._write_cache(name, filepath, source, module)
+        # Another loader sharing the dict may have read it meanwhile; keep one copy
+        return self.modules.setdefault(name, module)
+
+    def _add_module(self, module: Dict[str, Any]) -> None:
+        controls = module['controls']
+        self.controls.update(controls)
+        self.events.update(module['events'])
+        for identifier, control in controls.items():
+            self.categories.setdefault(control.get('category', ''), set()).add(identifier)
+        self._address_lookup = None
+
+    @classmethod
+    def _compile_module(cls, json_data: Dict[str, Any]) -> Dict[str, Any]:
+        controls: Dict[str, Dict[str, Any]] = {}
+
         for category in json_data.values():
             if not isinstance(category, dict):
                 continue
-                
+
             for control in category.values():
                 if not isinstance(control, dict) or 'identifier' not in control:
                     continue
 
+                identifier = control['identifier']
+                outputs = []
                 for output in control.get('outputs', []):
-                    address = output['address']
-                    if address not in self.address_lookup:
-                        self.address_lookup[address] = []
-                    # Avoid duplicate entries
-                    if control not in self.address_lookup[address]:
-                        self.address_lookup[address].append(control)
\ No newline at end of file
+                    outputs.append({k: output[k] for k in cls._OUTPUT_KEYS if k in output})
+
+                compact = {k: control[k] for k in cls._CONTROL_KEYS if k in control}
+                compact['outputs'] = outputs
+                controls[identifier] = compact
+
+        return {
+            'controls': controls,
+            'events': list(controls),
+        }
+
+    def _cache_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f'{name}.bin')
+
+    def _read_cache(self, name: str, filepath: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+
+        try:
+            st = os.stat(filepath)
+            with open(self._cache_path(name), 'rb') as f:
+                header = f.read(self._CACHE_HEADER.size)
+                magic, version, marshal_version, mtime_ns, size, digest = self._CACHE_HEADER.unpack(header)
+                if (magic, version, marshal_version) != (self.CACHE_MAGIC, self.CACHE_VERSION, marshal.version):
+                    return None
+
+                if (mtime_ns, size) != (st.st_mtime_ns, st.st_size):
+                    # Touched but possibly unchanged, e.g. after reinstalling DCS-BIOS
+                    with open(filepath, 'rb') as src:
+                        source = src.read()
+                    if size != len(source) or digest != self._digest(source):
+                        return None
+                    module = marshal.loads(f.read())
+                    self._write_cache(name, filepath, source, module)
+                    return module
+
+                return marshal.loads(f.read())
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            return None
+
+    def _write_cache(self, name: str, filepath: str, source: bytes, module: Dict[str, Any]) -> None:
+        if not self.cache_dir:
+            return
+
+        try:
+            st = os.stat(filepath)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            header = self._CACHE_HEADER.pack(
+                self.CACHE_MAGIC, self.CACHE_VERSION, marshal.version,
+                st.st_mtime_ns, st.st_size, self._digest(source)
+            )
+            path = self._cache_path(name)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                f.write(marshal.dumps(module))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # The cache is an optimisation; parsing the JSON still works
+
+    @staticmethod
+    def _digest(source: bytes) -> bytes:
+        return hashlib.blake2b(source, digest_size=16).digest()
@@ -0,0 +1,73 @@
+from typing import List, Optional, Sequence, Tuple
+
+class ExportMemory:
+    """Mirror of the 64K DCS-BIOS export address space.
+
+    Words are stored in host byte order, which is the stream's little-endian
+    order on every platform DCS runs on, so ``buffer`` can be sliced directly
+    for string outputs. Every write records a dirty byte range until the next
+    call to ``take_dirty``. When ``changes`` is a list, ``take_dirty`` also
+    appends the ranges it returns to it, for a consumer other than the
+    dispatcher such as the shared memory hub.
+    """
+    SIZE = 0x10000
+
+    def __init__(self):
+        # One spare word so a write at 0xFFFF stays inside the buffer
+        self.buffer = bytearray(self.SIZE + 2)
+        self.words = memoryview(self.buffer)[:self.SIZE].cast('H')
+        self._dirty: List[Tuple[int, int]] = []
+        self.changes: Optional[List[Tuple[int, int]]] = None
+
+    def write(self, address: int, words: Sequence[int]):
+        end = address + 2 * len(words)
+        if address & 1:
+            self.buffer[address:end] = words
+        else:
+            self.words[address >> 1:end >> 1] = words
+        self._dirty.append((address, end))
+
+    def write_bytes(self, address: int, data: bytes):
+        end = address + len(data)
+        self.buffer[address:end] = data
+        self._dirty.append((address, end))
+
+    def write_word(self, address: int, data: int):
+        if address & 1:
+            self.buffer[address] = data & 0xFF
+            self.buffer[address + 1] = data >> 8
+        else:
+            self.words[address >> 1] = data
+        self._dirty.append((address, address + 2))
+
+    def touch(self):
+        """Mark the whole memory dirty, so the next frame re-evaluates every control."""
+        self._dirty.append((0, self.SIZE))
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty)
+
+    def take_dirty(self) -> List[Tuple[int, int]]:
+        """Return the merged dirty ranges, sorted by address, and clear them."""
+        if not self._dirty:
+            return []
+
+        ranges = sorted(self._dirty)
+        self._dirty = []
+
+        merged = [ranges[0]]
+        for start, end in ranges[1:]:
+            last_start, last_end = merged[-1]
+            if start <= last_end:
+                if end > last_end:
+                    merged[-1] = (last_start, end)
+            else:
+                merged.append((start, end))
+        if self.changes is not None:
+            self.changes.extend(merged)
+        return merged
+
+    def clear(self):
+        self.buffer[:] = bytes(len(self.buffer))
+        self._dirty = []
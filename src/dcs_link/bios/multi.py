@@ -0,0 +1,139 @@
+import asyncio
+import dataclasses
+import functools
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from ..config import LinkConfig, NetworkConfig
+from .client import BiosClient
+
+
+class MultiBiosClient:
+    """Follow several DCS-BIOS sources, such as DCS servers or multicast groups, from one event loop.
+
+    Every source gets its own ``BiosClient``, so its own socket, parser and
+    aircraft state, all receiving on the calling loop. The clients share one
+    set of compiled JSON modules, so sources flying the same aircraft load
+    and hold its control tables once. Handlers are called with the source
+    name in front of their usual arguments: ``(source, value)``, or
+    ``(source, event_name, value)`` for patterns and categories.
+
+    Sources need distinct multicast groups or receive ports.
+
+    Args:
+        config: Shared configuration; its ``network`` is replaced by each source's
+        sources: Network configuration of every source, by source name
+    """
+    def __init__(self, config: LinkConfig, sources: Dict[str, NetworkConfig]):
+        if config.receive_mode != "asyncio":
+            raise ValueError("MultiBiosClient sources receive in 'asyncio' mode")
+
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        self.clients: Dict[str, BiosClient] = {
+            name: BiosClient(dataclasses.replace(config, network=network), self.modules)
+            for name, network in sources.items()
+        }
+        # (source, handler) -> (wrapper passing the source, registrations using it)
+        self._tagged: Dict[Tuple[str, Callable], Tuple[Callable, Set[Tuple[str, str]]]] = {}
+
+    def __getitem__(self, source: str) -> BiosClient:
+        return self.clients[source]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.clients)
+
+    async def connect(self, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """Connect every source at once, returning whether each one connected.
+
+        Args:
+            timeout: Time to wait for each source, None for no timeout
+        """
+        results = await asyncio.gather(*(client.connect(timeout) for client in self.clients.values()))
+        return dict(zip(self.clients, results))
+
+    def _tag(self, source: str, handler: Callable, registration: Tuple[str, str]) -> Callable:
+        # The same callable for the same handler, so registering again replaces it
+        key = (source, handler)
+        entry = self._tagged.get(key)
+        if entry is None:
+            entry = self._tagged[key] = (functools.update_wrapper(functools.partial(handler, source), handler), set())
+        entry[1].add(registration)
+        return entry[0]
+
+    def _untag(self, source: str, handler: Optional[Callable], registration: Tuple[str, str]) -> Optional[Callable]:
+        """Forget a registration of one handler, or of all of them, returning the wrapper it used."""
+        keys = [(source, handler)] if handler is not None else [key for key in self._tagged if key[0] == source]
+        tagged = None
+        for key in keys:
+            entry = self._tagged.get(key)
+            if entry is not None and registration in entry[1]:
+                entry[1].discard(registration)
+                if not entry[1]:
+                    del self._tagged[key]
+                tagged = entry[0]
+        return tagged
+
+    def on(self, event_name: str, handler: Callable, source: Optional[str] = None, **options):
+        """Register an event handler on one or every source.
+
+        Args:
+            event_name: Name or wildcard pattern of the events to listen for
+            handler: Called with the source name first, then the usual arguments
+            source: Source to listen to, None for all of them
+            options: Delivery options of ``BiosClient.on``
+        """
+        for name in self._sources(source):
+            self.clients[name].on(event_name, self._tag(name, handler, ("event", event_name)), **options)
+
+    def on_category(self, category: str, handler: Callable, source: Optional[str] = None, **options):
+        """Register a handler for every control of a category, called with ``(source, event_name, value)``."""
+        for name in self._sources(source):
+            self.clients[name].on_category(category, self._tag(name, handler, ("category", category)), **options)
+
+    def off(self, event_name: str, handler: Optional[Callable] = None, source: Optional[str] = None):
+        """Remove one or all handlers of an event or pattern, on one or every source."""
+        for name in self._sources(source):
+            tagged = self._untag(name, handler, ("event", event_name))
+            if handler is None:
+                self.clients[name].off(event_name)
+            elif tagged is not None:
+                # A handler never registered on this source must not remove all of them
+                self.clients[name].off(event_name, tagged)
+
+    def off_category(self, category: str, handler: Optional[Callable] = None, source: Optional[str] = None):
+        """Remove category handlers, on one or every source."""
+        for name in self._sources(source):
+            tagged = self._untag(name, handler, ("category", category))
+            if handler is None:
+                self.clients[name].off_category(category)
+            elif tagged is not None:
+                self.clients[name].off_category(category, tagged)
+
+    def _sources(self, source: Optional[str]) -> Tuple[str, ...]:
+        if source is None:
+            return tuple(self.clients)
+        if source not in self.clients:
+            raise KeyError(f"Unknown source: {source}")
+        return (source,)
+
+    def send(self, source: str, command: str) -> Optional[asyncio.Future]:
+        """Send a command to the DCS-BIOS of one source."""
+        return self.clients[source].send(command)
+
+    @property
+    def aircraft(self) -> Dict[str, Optional[str]]:
+        """Aircraft name of every source."""
+        return {name: client.aircraft_name for name, client in self.clients.items()}
+
+    @property
+    def events(self) -> Set[str]:
+        """Events of every source's aircraft."""
+        return set().union(*(client.events for client in self.clients.values()))
+
+    def metrics(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Metrics snapshot of every source, see ``BiosClient.metrics``."""
+        return {name: client.metrics(reset) for name, client in self.clients.items()}
+
+    def close(self):
+        """Close every source."""
+        for client in self.clients.values():
+            client.close()
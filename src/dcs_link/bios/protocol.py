@@ -1,6 +1,25 @@
-from typing import Callable, Iterable
+import struct
+import sys
+from array import array
+from typing import Callable, Iterable, List, Optional
+
+_HEADER = struct.Struct('<HH')
+_WORD = struct.Struct('<H')
+_SYNC = b'\x55\x55\x55\x55'
 
 class ProtocolParser:
+	"""Decoder for the DCS-BIOS export stream.
+
+	Datagrams are decoded a whole write block at a time: every
+	``(address, count, data)`` block is handed to ``on_block_write`` as one
+	run of 16-bit words. ``on_data_write`` still receives one call per word for
+	callers that want the old interface. Blocks split across datagrams are
+	carried over, and the output is the same as the byte-wise state machine.
+	``on_frame_sync`` is called whenever a sync sequence starts a new frame.
+
+	``sync_losses`` counts the times data had to be skipped while waiting for a
+	sync, and ``resyncs`` the syncs that arrived in the middle of a block.
+	"""
 	class _State:
 		AddressLow = 0
 		AddressHigh = 1
@@ -10,8 +29,15 @@ class ProtocolParser:
 		DataHigh = 5
 		WaitForSync = 6
 
-	def __init__(self, on_data_write: Callable[[int, int], None]):
+	def __init__(self,
+			on_data_write: Optional[Callable[[int, int], None]] = None,
+			on_block_write: Optional[Callable[[int, memoryview], None]] = None,
+			on_frame_sync: Optional[Callable[[], None]] = None):
 		self._on_data_write = on_data_write
+		self._on_block_write = on_block_write
+		self._on_frame_sync = on_frame_sync
+		self.sync_losses = 0
+		self.resyncs = 0
 		self._state = ProtocolParser._State.WaitForSync
 		self._sync_byte_count = 0
 		self._address = 0
@@ -26,8 +52,88 @@ class ProtocolParser:
 		self._data = 0
 
 	def feed_bytes(self, data: Iterable[int]) -> None:
-		for b in data:
-			self._process_byte(b if isinstance(b, int) else ord(b))
+		if isinstance(data, memoryview):
+			data = data.tobytes()
+		elif not isinstance(data, (bytes, bytearray)):
+			data = bytes(b if isinstance(b, int) else ord(b) for b in data)
+
+		State = ProtocolParser._State
+		view = memoryview(data)
+		start = 0
+		for sync_end in self._find_syncs(data):
+			# A complete frame stops on the sync's own bytes, read as address 0x5555
+			if self._decode(view, start, sync_end) < sync_end - 4:
+				self.sync_losses += 1
+			if self._state not in (State.WaitForSync, State.AddressLow):
+				self.resyncs += 1
+			self._state = State.AddressLow
+			start = sync_end
+			if self._on_frame_sync:
+				try:
+					self._on_frame_sync()
+				except Exception:
+					pass
+		if self._decode(view, start, len(data)) < len(data) - 4:
+			self.sync_losses += 1
+
+	def _find_syncs(self, data: bytes) -> List[int]:
+		"""Return the offsets just past every fourth consecutive 0x55 byte."""
+		syncs = []
+		pos = 0
+		if self._sync_byte_count:
+			need = 4 - self._sync_byte_count
+			head = data[:need]
+			if head == _SYNC[:len(head)]:
+				if len(head) < need:
+					self._sync_byte_count += len(head)
+					return syncs
+				syncs.append(need)
+				pos = need
+
+		while True:
+			found = data.find(_SYNC, pos)
+			if found < 0:
+				break
+			pos = found + 4
+			syncs.append(pos)
+
+		trailing = 0
+		end = len(data) - 1
+		while trailing < 3 and end - trailing >= pos and data[end - trailing] == 0x55:
+			trailing += 1
+		self._sync_byte_count = trailing
+		return syncs
+
+	def _decode(self, view: memoryview, pos: int, end: int) -> int:
+		"""Decode ``view[pos:end]`` and return where decoding stopped to wait for a sync."""
+		State = ProtocolParser._State
+		while pos < end:
+			state = self._state
+			if state == State.WaitForSync:
+				return pos
+
+			if state == State.AddressLow and end - pos >= 4:
+				address, count = _HEADER.unpack_from(view, pos)
+				if address == 0x5555:
+					self._address = address
+					self._state = State.WaitForSync
+					return pos
+				self._address = address
+				self._count = count
+				self._state = State.DataLow
+				pos += 4
+			elif state == State.DataLow and end - pos >= 2:
+				words = (self._count + 1) >> 1 if self._count > 0 else 1
+				n = min(words, (end - pos) >> 1)
+				self._emit(self._address, view[pos:pos + 2 * n])
+				pos += 2 * n
+				self._address = (self._address + 2 * n) & 0xFFFF
+				self._count -= 2 * n
+				self._state = State.DataLow if self._count > 0 else State.AddressLow
+			else:
+				self._process_byte(view[pos])
+				pos += 1
+		return end
 
 	def _process_byte(self, b: int) -> None:
 		if self._state == ProtocolParser._State.AddressLow:
@@ -53,22 +159,42 @@ class ProtocolParser:
 			self._data |= (b << 8)
 			self._count -= 1
 
-			try:
-				self._on_data_write(self._address, self._data)
-			except Exception:
-				pass
+			self._emit(self._address, memoryview(_WORD.pack(self._data)))
 
 			self._address = (self._address + 2) & 0xFFFF
 
 			self._state = ProtocolParser._State.DataLow if self._count > 0 else ProtocolParser._State.AddressLow
-		elif self._state == ProtocolParser._State.WaitForSync:
-			pass
 
-		if b == 0x55:
-			self._sync_byte_count += 1
-		else:
-			self._sync_byte_count = 0
+	def _emit(self, address: int, raw: memoryview) -> None:
+		size = len(raw) >> 1
+		first = (0x10000 - address + 1) >> 1
+		if size > first:
+			# The block runs past 0xFFFF; addresses wrap like the byte parser's
+			self._emit(address, raw[:2 * first])
+			self._emit((address + 2 * first) & 0xFFFF, raw[2 * first:])
+			return
+
+		words = _as_words(raw)
+		if self._on_block_write:
+			try:
+				self._on_block_write(address, words)
+			except Exception:
+				pass
+
+		if self._on_data_write:
+			for word in words:
+				try:
+					self._on_data_write(address, word)
+				except Exception:
+					pass
+				address = (address + 2) & 0xFFFF
 
-		if self._sync_byte_count == 4:
-			self._state = ProtocolParser._State.AddressLow
-			self._sync_byte_count = 0
\ No newline at end of file
+if sys.byteorder == 'little':
+	def _as_words(raw: memoryview) -> memoryview:
+		return raw.cast('H')
+else:
+	def _as_words(raw: memoryview) -> memoryview:
+		words = array('H')
+		words.frombytes(raw)
+		words.byteswap()
+		return memoryview(words)
@@ -0,0 +1,191 @@
+import asyncio
+import socket
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from ..metrics import Metrics
+from .capture import Recorder
+from .memory import ExportMemory
+from .protocol import ProtocolParser
+
+class DatagramReceiver(asyncio.DatagramProtocol):
+    """Datagram protocol that hands received datagrams over in batches.
+
+    On selector event loops the socket is drained right after each wakeup, up
+    to ``max_batch`` datagrams, so a backed-up socket costs one callback per
+    batch instead of one loop iteration per datagram. Proactor loops own the
+    socket's pending read, so there every datagram is collected until the loop
+    gets to the scheduled flush.
+    """
+    def __init__(self, sock: socket.socket, on_batch: Callable[[List[bytes]], None],
+                 on_error: Callable[[Exception], None], max_batch: int = 64):
+        self._sock = sock
+        self._on_batch = on_batch
+        self._on_error = on_error
+        self._max_batch = max_batch
+        self._batch: List[bytes] = []
+        self._drain = True
+        self._flush_handle: Optional[asyncio.Handle] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        loop = asyncio.get_event_loop()
+        proactor = getattr(asyncio, "ProactorEventLoop", None)
+        self._drain = not (proactor and isinstance(loop, proactor))
+
+    def datagram_received(self, data: bytes, addr):
+        batch = self._batch
+        batch.append(data)
+        if self._drain:
+            sock = self._sock
+            while len(batch) < self._max_batch:
+                try:
+                    batch.append(sock.recv(65536))
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError as e:
+                    self._on_error(e)
+                    break
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if batch:
+            self._on_batch(batch)
+
+    def error_received(self, exc: Exception):
+        self._on_error(exc)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._batch = []
+
+
+class ThreadedReceiver:
+    """Receive and decode DCS-BIOS datagrams on a dedicated OS thread.
+
+    The thread does the blocking reads and runs its own parser into a shadow
+    export memory. After every datagram (one frame, as DCS-BIOS sends them) the
+    dirty ranges become a delta, a tuple of ``(address, bytes)`` pairs, pushed
+    into a preallocated single-producer single-consumer ring buffer, and the
+    event loop is woken with ``call_soon_threadsafe`` at most once per pending
+    batch. When the ring is full the frame is counted in ``overruns`` and its
+    changes stay dirty, so they are coalesced into the next delta, or flushed
+    once the socket goes quiet, instead of being lost.
+
+    When ``metrics`` is set, the thread counts datagrams and bytes into it and
+    records the decode time of each datagram. Only the thread may write to it,
+    so it should not be a ``Metrics`` the event loop also records into.
+    """
+    def __init__(self, sock: socket.socket, loop: asyncio.AbstractEventLoop,
+                 on_frames: Callable[[List[Tuple[Tuple[int, bytes], ...]]], None],
+                 on_error: Callable[[Exception], None], ring_size: int = 256):
+        if ring_size < 1:
+            raise ValueError("ring_size must be at least 1")
+
+        self.overruns = 0
+        self.recorder: Optional[Recorder] = None
+        self.metrics: Optional[Metrics] = None
+        self._sock = sock
+        self._loop = loop
+        self._on_frames = on_frames
+        self._on_error = on_error
+        self._ring: List[Optional[Tuple[Tuple[int, bytes], ...]]] = [None] * ring_size
+        self._size = ring_size
+        self._head = 0  # Only advanced by the event loop
+        self._tail = 0  # Only advanced by the receiver thread
+        self._wake_pending = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._memory = ExportMemory()
+        self._parser = ProtocolParser(on_block_write=self._memory.write)
+
+    def start(self):
+        self._running = True
+        self._sock.settimeout(0.1)  # Lets the thread notice close() quickly
+        self._thread = threading.Thread(target=self._run, name="dcs-bios-receiver", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buffer = bytearray(65536)
+        while self._running:
+            try:
+                size = self._sock.recv_into(buffer)
+            except socket.timeout:
+                self._end_frame(overrun=False)  # Flush changes held back by an overrun
+                continue
+            except OSError as e:
+                if self._running:
+                    self._loop.call_soon_threadsafe(self._on_error, e)
+                break
+
+            data = buffer[:size]
+            recorder = self.recorder
+            if recorder:
+                recorder.write(data)
+            metrics = self.metrics
+            if metrics is None:
+                self._parser.feed_bytes(data)
+            else:
+                start = time.perf_counter()
+                self._parser.feed_bytes(data)
+                metrics.observe('decode_us', (time.perf_counter() - start) * 1e6)
+                metrics.count('datagrams')
+                metrics.count('bytes', size)
+            self._end_frame()
+
+    @property
+    def parser(self) -> ProtocolParser:
+        return self._parser
+
+    def _end_frame(self, overrun: bool = True):
+        memory = self._memory
+        if not memory.dirty:
+            return
+
+        tail = self._tail
+        if tail - self._head >= self._size:
+            if overrun:
+                self.overruns += 1
+            return
+
+        buffer = memory.buffer
+        self._ring[tail % self._size] = tuple(
+            (start, bytes(buffer[start:end])) for start, end in memory.take_dirty()
+        )
+        self._tail = tail + 1
+
+        if not self._wake_pending:
+            self._wake_pending = True
+            try:
+                self._loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                self._running = False  # Event loop closed
+
+    def _drain(self):
+        self._wake_pending = False
+        head, tail = self._head, self._tail
+        if head == tail:
+            return
+
+        ring, size = self._ring, self._size
+        frames = []
+        while head < tail:
+            index = head % size
+            frames.append(ring[index])
+            ring[index] = None
+            head += 1
+        self._head = head
+        self._on_frames(frames)
+
+    def close(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+        self._thread = None
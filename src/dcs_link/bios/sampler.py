@@ -0,0 +1,134 @@
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .memory import ExportMemory
+
+try:
+    import numpy as np
+except ImportError:  # optional, pip install dcs_link[numpy]
+    np = None
+
+
+class Sampler:
+    """Read many controls from the export memory at once.
+
+    The controls are compiled once into word index, mask and shift arrays for
+    the integer outputs and byte ranges for the string outputs. With NumPy a
+    read is one vectorized gather for the integers and one for the string
+    bytes, whatever the number of controls; without it the same tables are
+    walked in Python. Strings are only decoded when looked up.
+
+    Values are read as they are in memory, so a string whose characters have
+    not all arrived yet reads partially filled.
+
+    Args:
+        controls: Control definitions by identifier, as loaded by ``JsonLoader``
+        memory: Export memory to read from
+        names: Controls to read; each reads its first integer or string output
+    """
+    def __init__(self, controls: Dict[str, Dict[str, Any]], memory: ExportMemory, names: Sequence[str]):
+        self.names: Tuple[str, ...] = tuple(names)
+        self._memory = memory
+        self._positions: Dict[str, Tuple[bool, int]] = {}  # name -> (is_string, index)
+
+        index: List[int] = []
+        masks: List[int] = []
+        shifts: List[int] = []
+        ranges: List[Tuple[int, int]] = []
+        for name in self.names:
+            if name in self._positions:
+                continue
+            output = self._output(controls, name)
+            if output.get('type') == 'integer':
+                self._positions[name] = (False, len(index))
+                index.append(output.get('address', 0) >> 1)
+                masks.append(output.get('mask', 0xFFFF))
+                shifts.append(output.get('shift_by', 0))
+            else:
+                self._positions[name] = (True, len(ranges))
+                address = output.get('address', 0)
+                ranges.append((address, address + output.get('max_length', 1)))
+
+        self.integers: Tuple[str, ...] = tuple(n for n, (is_string, _) in self._positions.items() if not is_string)
+        self.strings: Tuple[str, ...] = tuple(n for n, (is_string, _) in self._positions.items() if is_string)
+
+        # Offsets of every string inside the gathered string bytes
+        self._offsets: List[Tuple[int, int]] = []
+        offset = 0
+        for start, end in ranges:
+            self._offsets.append((offset, offset + end - start))
+            offset += end - start
+
+        if np is not None:
+            self._words = np.frombuffer(memory.buffer, dtype=np.uint16, count=ExportMemory.SIZE // 2)
+            self._bytes = np.frombuffer(memory.buffer, dtype=np.uint8)
+            self._index = np.array(index, dtype=np.intp)
+            self._masks = np.array(masks, dtype=np.uint16)
+            self._shifts = np.array(shifts, dtype=np.uint16)
+            self._string_index = np.concatenate(
+                [np.arange(start, end, dtype=np.intp) for start, end in ranges]
+            ) if ranges else np.empty(0, dtype=np.intp)
+        else:
+            self._table = list(zip(index, masks, shifts))
+            self._ranges = ranges
+
+    @staticmethod
+    def _output(controls: Dict[str, Dict[str, Any]], name: str) -> Dict[str, Any]:
+        control = controls.get(name)
+        if not control:
+            raise KeyError(f"Unknown control: {name}")
+        for output in control.get('outputs', []):
+            if output.get('type') in ('integer', 'string'):
+                return output
+        raise KeyError(f"Control has no integer or string output: {name}")
+
+    def gather(self) -> Any:
+        """Return the current integer values, in the order of ``integers``."""
+        if np is not None:
+            return (self._words[self._index] & self._masks) >> self._shifts
+        words = self._memory.words
+        return [(words[i] & mask) >> shift for i, mask, shift in self._table]
+
+    def read(self) -> 'Snapshot':
+        """Take a snapshot of the controls from the current memory."""
+        if np is not None:
+            raw = self._bytes[self._string_index].tobytes()
+        else:
+            buffer = self._memory.buffer
+            raw = b"".join([buffer[start:end] for start, end in self._ranges])
+        return Snapshot(self, self.gather(), raw)
+
+
+class Snapshot(Mapping):
+    """Values of a ``Sampler``'s controls at one point in time.
+
+    Maps control identifiers to integers or strings. ``array`` holds the
+    integer values in the order of ``sampler.integers``, as a NumPy array when
+    NumPy is installed and a list otherwise.
+    """
+    __slots__ = ('sampler', 'array', '_raw', '_decoded')
+
+    def __init__(self, sampler: Sampler, array: Any, raw: bytes):
+        self.sampler = sampler
+        self.array = array
+        self._raw = raw
+        self._decoded: Optional[Dict[int, str]] = None
+
+    def __getitem__(self, name: str) -> Any:
+        is_string, index = self.sampler._positions[name]
+        if not is_string:
+            return int(self.array[index])
+
+        if self._decoded is None:
+            self._decoded = {}
+        value = self._decoded.get(index)
+        if value is None:
+            start, end = self.sampler._offsets[index]
+            value = self._raw[start:end].decode('utf-8', errors='ignore').strip('\x00 \t\n\r')
+            self._decoded[index] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sampler._positions)
+
+    def __len__(self) -> int:
+        return len(self.sampler._positions)
@@ -0,0 +1,186 @@
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+
+class _Command:
+    __slots__ = ('control', 'line', 'value', 'futures')
+
+    def __init__(self, control: str, line: bytes, value: Optional[int], futures: List[asyncio.Future]):
+        self.control = control
+        self.line: Optional[bytes] = line  # None once replaced by a later value
+        self.value = value  # Absolute position, None for INC, DEC, TOGGLE, relative steps...
+        self.futures = futures
+
+
+class CommandSender:
+    """Batch commands to DCS-BIOS into one datagram per event loop iteration.
+
+    Commands issued during the same iteration are joined into newline
+    delimited datagrams sent once the iteration ends, in the order they were
+    issued. Only absolute positions (``CONTROL 123``) are coalesced: a queued
+    value lying between the value before it and the new one is a step of a
+    sweep and is replaced, so a knob turned through many positions sends
+    where it turned, while turning points such as a button's press and
+    release are all sent. Repeating the queued value sends it once. ``INC``,
+    ``DEC``, ``TOGGLE``, relative steps like ``+3200`` and any other argument
+    are never merged. A control with a rate limit sends its queued commands
+    one per slot.
+
+    Args:
+        send_datagram: Called with the bytes of every datagram to send
+        max_rate: Default per-control limit in commands per second, 0 for none
+        max_datagram: Largest datagram in bytes, longer batches are split
+    """
+    def __init__(self, send_datagram: Callable[[bytes], None], max_rate: float = 0, max_datagram: int = 1024):
+        self._send_datagram = send_datagram
+        self._interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._max_datagram = max_datagram
+        self._intervals: Dict[str, float] = {}
+        self._last_sent: Dict[str, float] = {}
+        self._values: Dict[str, int] = {}  # Last absolute position sent per control
+        self._queue: List[_Command] = []
+        self._pending: Dict[str, List[_Command]] = {}  # Queued commands per control, in order
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_due = 0.0
+        self.datagrams = 0
+        self.commands = 0
+
+    def set_rate(self, control: str, max_rate: Optional[float]):
+        """Limit ``control`` to ``max_rate`` commands per second, 0 for no limit, None for the default."""
+        if max_rate is None:
+            self._intervals.pop(control, None)
+        else:
+            self._intervals[control] = 1.0 / max_rate if max_rate > 0 else 0.0
+
+    def send(self, command: str) -> asyncio.Future:
+        """Queue ``command``, returning a future done once it, or the value replacing it, is sent."""
+        line = command.strip()
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        if not line:
+            future.set_result(None)
+            return future
+
+        parts = line.split(None, 1)
+        control = parts[0]
+        value = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+        futures = [future]
+        pending = self._pending.setdefault(control, [])
+        if value is not None and pending and pending[-1].value is not None:
+            last = pending[-1]
+            before = pending[-2].value if len(pending) > 1 else self._values.get(control)
+            if last.value == value or (before is not None and min(before, value) <= last.value <= max(before, value)):
+                # Replaced rather than updated, so the new value goes after the
+                # commands issued before it
+                last.line = None
+                futures = last.futures + futures
+                pending.pop()
+
+        queued = _Command(control, line.encode("utf-8") + b"\n", value, futures)
+        pending.append(queued)
+        self._queue.append(queued)
+
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_soon(self._flush)
+        return future
+
+    async def flush(self):
+        """Send the queued commands now and wait for those held by a rate limit."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush()
+        futures = [future for queued in self._queue if queued.line is not None for future in queued.futures]
+        if futures:
+            await asyncio.gather(*futures)
+
+    def _flush(self):
+        self._flush_handle = None
+        if not self._queue:
+            return
+
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        lines: List[bytes] = []
+        done: List[asyncio.Future] = []
+        held: List[_Command] = []
+        next_due: Optional[float] = None
+        for queued in self._queue:
+            if queued.line is None:
+                continue
+            control = queued.control
+            interval = self._intervals.get(control, self._interval)
+            if interval:
+                due = self._last_sent.get(control, -interval) + interval
+                if due > now:
+                    held.append(queued)
+                    next_due = due if next_due is None else min(next_due, due)
+                    continue
+                self._last_sent[control] = now
+            lines.append(queued.line)
+            done.extend(queued.futures)
+            if queued.value is not None:
+                self._values[control] = queued.value
+
+        self._queue = held
+        self._pending = {}
+        for queued in held:
+            self._pending.setdefault(queued.control, []).append(queued)
+
+        error: Optional[Exception] = None
+        try:
+            for datagram in self._pack(lines):
+                self._send_datagram(datagram)
+                self.datagrams += 1
+        except Exception as e:
+            error = e
+        self.commands += len(lines)
+
+        for future in done:
+            if not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+        if next_due is not None and (self._timer is None or next_due < self._timer_due):
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer_due = next_due
+            self._timer = loop.call_at(next_due, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._flush()
+
+    def _pack(self, lines: List[bytes]) -> List[bytes]:
+        datagrams: List[bytes] = []
+        current: List[bytes] = []
+        size = 0
+        for line in lines:
+            if current and size + len(line) > self._max_datagram:
+                datagrams.append(b"".join(current))
+                current = []
+                size = 0
+            current.append(line)
+            size += len(line)
+        if current:
+            datagrams.append(b"".join(current))
+        return datagrams
+
+    def close(self):
+        """Drop the queued commands, cancelling their futures."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for queued in self._queue:
+            if queued.line is not None:
+                for future in queued.futures:
+                    future.cancel()
+        self._queue = []
+        self._pending.clear()
+        self._last_sent.clear()
+        self._values.clear()
@@ -0,0 +1,158 @@
+import time
+from typing import Any, Dict, Optional
+
+from .sampler import Sampler
+
+try:
+    import numpy as np
+except ImportError:  # optional, pip install dcs_link[numpy]
+    np = None
+
+
+class SeriesRecorder:
+    """Record integer controls into preallocated NumPy columns, one row per export frame.
+
+    Each frame is read straight from the export memory with one vectorized
+    gather of the sampler and written into a column per control, next to a
+    timestamp column. Nothing is allocated per frame and no handler runs.
+
+    With ``decimate`` above 1, every row covers that many frames, combined
+    with ``reduce``: ``"last"`` keeps the last frame's values, ``"mean"``,
+    ``"min"`` and ``"max"`` aggregate them. Means are stored as float32, the
+    other reductions keep the uint16 export words.
+
+    ``rebind`` points the recorder at a sampler compiled against other tables,
+    as the client does when the aircraft changes; while it has none, frames
+    are not recorded and ``paused`` is true.
+
+    Args:
+        sampler: Controls to record, integer outputs only
+        capacity: Rows kept in memory
+        ring: Overwrite the oldest rows once full; otherwise stop recording and count
+            further rows as ``dropped``
+        decimate: Frames per row
+        reduce: How the frames of a row are combined, one of ``REDUCERS``
+    """
+    REDUCERS = ("last", "mean", "min", "max")
+
+    def __init__(self, sampler: Sampler, capacity: int = 65536, ring: bool = True,
+                 decimate: int = 1, reduce: str = "last"):
+        if np is None:
+            raise ImportError("Recording series requires NumPy: pip install dcs_link[numpy]")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if decimate < 1:
+            raise ValueError("decimate must be at least 1")
+        if reduce not in self.REDUCERS:
+            raise ValueError(f"reduce must be one of {self.REDUCERS}")
+        if sampler.strings:
+            raise ValueError(f"Only integer controls can be recorded: {', '.join(sampler.strings)}")
+
+        self.controls = sampler.integers
+        self.capacity = capacity
+        self.ring = ring
+        self.decimate = decimate
+        self.reduce = reduce
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.data = np.zeros((len(self.controls), capacity), dtype=np.float32 if reduce == "mean" else np.uint16)
+        self.frames = 0
+        self.rows = 0  # Rows written since the start, including overwritten ones
+        self.dropped = 0
+        self._sampler: Optional[Sampler] = sampler
+        self._pending = 0
+        self._accumulator: Any = None
+
+    @property
+    def paused(self) -> bool:
+        return self._sampler is None
+
+    def rebind(self, sampler: Optional[Sampler]):
+        """Read the same controls through ``sampler`` from now on, or pause the recording with ``None``."""
+        if sampler is not None and sampler.integers != self.controls:
+            raise ValueError(f"The sampler must read {', '.join(self.controls)} as integers")
+        self._sampler = sampler
+        self._pending = 0
+        self._accumulator = None
+
+    def capture(self, timestamp: Optional[float] = None):
+        """Read the current frame from memory; called by the client after every frame."""
+        if self._sampler is None:
+            return
+        values = self._sampler.gather()
+        self.frames += 1
+        if self.decimate > 1:
+            if self.reduce == "last" or not self._pending:
+                accumulator = values.astype(np.float64) if self.reduce == "mean" else values
+            elif self.reduce == "mean":
+                accumulator = self._accumulator + values
+            elif self.reduce == "min":
+                accumulator = np.minimum(self._accumulator, values)
+            else:
+                accumulator = np.maximum(self._accumulator, values)
+
+            self._pending += 1
+            if self._pending < self.decimate:
+                self._accumulator = accumulator
+                return
+            self._pending = 0
+            self._accumulator = None
+            values = accumulator / self.decimate if self.reduce == "mean" else accumulator
+
+        if self.rows >= self.capacity and not self.ring:
+            self.dropped += 1
+            return
+
+        position = self.rows % self.capacity
+        self.data[:, position] = values
+        self.timestamps[position] = time.time() if timestamp is None else timestamp
+        self.rows += 1
+
+    def __len__(self) -> int:
+        return min(self.rows, self.capacity)
+
+    def _order(self) -> Any:
+        if self.rows <= self.capacity:
+            return slice(0, self.rows)
+        start = self.rows % self.capacity
+        return np.r_[start:self.capacity, 0:start]
+
+    @property
+    def times(self) -> Any:
+        """Timestamps of the rows kept, oldest first, in seconds since the epoch."""
+        return self.timestamps[self._order()]
+
+    def column(self, control: str) -> Any:
+        """Values of one control for the rows kept, oldest first."""
+        return self.data[self.controls.index(control)][self._order()]
+
+    def columns(self) -> Dict[str, Any]:
+        """Values of every control for the rows kept, oldest first."""
+        data = self.data[:, self._order()]
+        return {control: data[i] for i, control in enumerate(self.controls)}
+
+    def export(self, path: str) -> Any:
+        """Write the rows kept to ``path``.
+
+        A ``.npz`` path gets one array per control plus ``timestamp``. Any
+        other path gets a ``.npy`` structured array with a field per column,
+        written through a memory map that is returned; ``np.load(path,
+        mmap_mode='r')`` maps it back without reading it into memory.
+        """
+        columns = self.columns()
+        if path.endswith('.npz'):
+            np.savez(path, timestamp=self.times, **columns)
+            return None
+
+        dtype = [('timestamp', np.float64)] + [(control, self.data.dtype) for control in self.controls]
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.dtype(dtype), shape=(len(self),))
+        out['timestamp'] = self.times
+        for control, values in columns.items():
+            out[control] = values
+        out.flush()
+        return out
+
+    def clear(self):
+        """Drop every row, keeping the buffers."""
+        self.frames = self.rows = self.dropped = 0
+        self._pending = 0
+        self._accumulator = None
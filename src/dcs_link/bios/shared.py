@@ -0,0 +1,232 @@
+import asyncio
+import os
+import struct
+import sys
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .memory import ExportMemory
+
+# magic, version, state, pid of the hub, sequence; the group and chunk generations
+# and the image follow the header
+_HEADER = struct.Struct('<8sHBxIQ')
+_MAGIC = b'DCSLSHM\x00'
+_VERSION = 2
+_SEQUENCE_OFFSET = 16
+_GENERATIONS_OFFSET = 32
+_LIVE, _CLOSED = 1, 0
+
+# Blocks published by this process, still tracked for cleanup on exit
+_published = set()
+
+# The hub stamps every chunk of this many bytes it copies with the frame's sequence,
+# and every group of chunks holding one, so readers skip untouched groups at once
+CHUNK_SIZE = 128
+GROUP_CHUNKS = 32
+_CHUNKS = ExportMemory.SIZE // CHUNK_SIZE
+_GROUPS = _CHUNKS // GROUP_CHUNKS
+_IMAGE_OFFSET = _GENERATIONS_OFFSET + 8 * (_GROUPS + _CHUNKS)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+
+    shm = shared_memory.SharedMemory(name)
+    if os.name == 'posix' and name not in _published:
+        # Before 3.13 attaching registers the block with the resource tracker,
+        # which would unlink it under the hub when this process exits
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _alive(pid: int) -> bool:
+    if os.name != 'posix':
+        return True  # Elsewhere a block only outlives its hub while readers hold it
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedExport:
+    """Publish the export memory of a hub process in shared memory.
+
+    The block holds a header with a sequence counter, a generation per chunk
+    of the image and per group of chunks, and the 64K image. Only the chunks
+    written since the last frame are copied, each stamped with the frame's
+    sequence along with its group, so readers find and copy just those. The counter is odd while chunks are being copied
+    and is bumped again once they are complete, so readers can tell a torn
+    copy from a frame.
+
+    Args:
+        name: Name of the shared memory block
+    """
+    def __init__(self, name: str):
+        size = _IMAGE_OFFSET + ExportMemory.SIZE
+        self.sequence = 0
+        _published.add(name)
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            self._shm = _attach(name)
+            magic, _, state, pid, sequence = _HEADER.unpack_from(self._shm.buf, 0)
+            if self._shm.size < size or (magic == _MAGIC and state == _LIVE and _alive(pid)):
+                self._shm.close()
+                _published.discard(name)
+                raise FileExistsError(f"Shared export '{name}' is in use by another hub")
+            # Left behind by a hub that did not shut down cleanly; readers still
+            # attached to it keep following the sequence
+            if magic == _MAGIC:
+                self.sequence = sequence + (sequence & 1)
+        self.name = name
+        self._generations = self._shm.buf[_GENERATIONS_OFFSET:_IMAGE_OFFSET].cast('Q')
+        self._full = True  # The first frame copies the whole image
+        _HEADER.pack_into(self._shm.buf, 0, _MAGIC, _VERSION, _LIVE, os.getpid(), self.sequence)
+
+    def publish(self, buffer: bytearray, ranges: Sequence[Tuple[int, int]]):
+        """Copy the byte ``ranges`` of the export memory ``buffer`` into the block as the next frame."""
+        if self._full:
+            ranges = ((0, ExportMemory.SIZE),)
+            self._full = False
+        elif not ranges:
+            return
+
+        buf = self._shm.buf
+        generations = self._generations
+        sequence = self.sequence + 2
+        struct.pack_into('<Q', buf, _SEQUENCE_OFFSET, self.sequence + 1)
+        source = memoryview(buffer)
+        for start, end in ranges:
+            first = start // CHUNK_SIZE
+            last = min((end + CHUNK_SIZE - 1) // CHUNK_SIZE, _CHUNKS)
+            start, end = first * CHUNK_SIZE, last * CHUNK_SIZE
+            buf[_IMAGE_OFFSET + start:_IMAGE_OFFSET + end] = source[start:end]
+            for chunk in range(first, last):
+                generations[_GROUPS + chunk] = sequence
+            for group in range(first // GROUP_CHUNKS, (last - 1) // GROUP_CHUNKS + 1):
+                generations[group] = sequence
+        self.sequence = sequence
+        struct.pack_into('<Q', buf, _SEQUENCE_OFFSET, sequence)
+
+    def close(self):
+        """Tell the readers the hub is gone and remove the block."""
+        _HEADER.pack_into(self._shm.buf, 0, _MAGIC, _VERSION, _CLOSED, os.getpid(), self.sequence)
+        self._generations.release()
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        _published.discard(self.name)
+
+
+class SharedReader:
+    """Follow the export memory published by a hub in place of the UDP socket.
+
+    Every poll checks the sequence counter; when a new frame is published the
+    chunks stamped since the last frame read are copied out and handed over
+    as a frame delta, the same ``(address, bytes)`` pairs the receiver thread
+    produces.
+
+    The client's export memory stays a private copy rather than a view of the
+    block: a frame is only dispatched once its sequence shows it was not torn,
+    samplers can read the memory at any time, a reset clears it, and views
+    into the block would keep it from being closed. The copy costs a pass
+    over the 16 group generations per poll, and per frame copying each stamped
+    128-byte chunk out of the block and into the memory; the whole 64K image
+    is only copied on attach and ``resync``.
+
+    Args:
+        name: Name of the shared memory block
+        poll_interval: Seconds between checks for a new frame
+    """
+    def __init__(self, name: str, poll_interval: float = 0.005):
+        self.name = name
+        self.poll_interval = poll_interval
+        self.frames = 0
+        self.closed = asyncio.Event()
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._generations: Optional[memoryview] = None
+        self._sequence = -1  # Last frame read, -1 to read the whole image
+
+    async def run(self, on_frames: Callable[[List[Tuple[Tuple[int, bytes], ...]]], None]):
+        """Attach once the hub is up and call ``on_frames`` with every new frame until it closes."""
+        self.closed.clear()
+        self.resync()
+        try:
+            while self._shm is None:
+                try:
+                    self._shm = self._attach()
+                except FileNotFoundError:
+                    pass
+                if self._shm is None:
+                    await asyncio.sleep(self.poll_interval)
+            self._generations = self._shm.buf[_GENERATIONS_OFFSET:_IMAGE_OFFSET].cast('Q')
+
+            while True:
+                buf = self._shm.buf
+                _, _, state, _, current = _HEADER.unpack_from(buf, 0)
+                if current != self._sequence and not current & 1:
+                    delta = self._read(buf)
+                    # A torn copy is skipped; the next poll reads the frame again
+                    if struct.unpack_from('<Q', buf, _SEQUENCE_OFFSET)[0] == current:
+                        self._sequence = current
+                        if delta:
+                            self.frames += 1
+                            on_frames([delta])
+                # The hub publishes its last frame before closing
+                if state == _CLOSED:
+                    break
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self.close()
+            self.closed.set()
+
+    def _attach(self) -> Optional[shared_memory.SharedMemory]:
+        shm = _attach(self.name)
+        magic, version, _, _, _ = _HEADER.unpack_from(shm.buf, 0)
+        if magic == _MAGIC and version == _VERSION:
+            return shm
+
+        shm.close()
+        if magic == bytes(len(_MAGIC)):
+            return None  # Just created, the hub has not written the header yet
+        raise ValueError(f"Not a DCS-Link shared export: {self.name}")
+
+    def resync(self):
+        """Hand the whole image over again with the next poll, even if no new frame was published."""
+        self._sequence = -1
+
+    def _read(self, buf: memoryview) -> Tuple[Tuple[int, bytes], ...]:
+        if self._sequence < 0:
+            return ((0, bytes(buf[_IMAGE_OFFSET:_IMAGE_OFFSET + ExportMemory.SIZE])),)
+
+        last = self._sequence
+        generations = self._generations
+        runs: List[List[int]] = []  # [first, last + 1] chunks stamped since the last frame read
+        for group in range(_GROUPS):
+            if generations[group] <= last:
+                continue
+            for chunk in range(group * GROUP_CHUNKS, (group + 1) * GROUP_CHUNKS):
+                if generations[_GROUPS + chunk] > last:
+                    if runs and runs[-1][1] == chunk:
+                        runs[-1][1] = chunk + 1
+                    else:
+                        runs.append([chunk, chunk + 1])
+        return tuple(
+            (first * CHUNK_SIZE, bytes(buf[_IMAGE_OFFSET + first * CHUNK_SIZE:_IMAGE_OFFSET + end * CHUNK_SIZE]))
+            for first, end in runs
+        )
+
+    def close(self):
+        if self._generations is not None:
+            self._generations.release()
+            self._generations = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Optional, Tuple
+
+from ..metrics import Metrics
+
+_UNSET = object()
+
+class Subscription:
+    """A handler registered for one event, with its delivery filters.
+
+    Args:
+        event_name: Name of the event the handler listens for
+        handler: Function or coroutine function called with the new value
+        on_error: Called with the event name, handler and exception when the handler raises
+        priority: Handlers with a higher priority run first for the same event
+        group: Pattern or category registration this subscription was resolved from;
+            such handlers are called with ``(event_name, value)``
+        change_only: Skip values equal to the last one delivered
+        deadband: Skip integer values within this distance of the last one delivered
+        max_rate: Maximum callbacks per second; values arriving faster are
+            coalesced and only the latest one is delivered
+        mode: ``"inline"`` runs the handler in the receive path, ``"task"`` in
+            an asyncio task and ``"thread"`` in the loop's default executor.
+            Defaults to ``"task"`` for coroutine functions, else ``"inline"``
+        queue_size: Maximum values waiting for a ``"task"`` or ``"thread"`` handler
+        overflow: ``"drop_oldest"`` discards the oldest queued value when the
+            queue is full, ``"latest"`` keeps only the newest waiting value
+
+    When ``metrics`` is set, filtered values count as ``callbacks_suppressed``,
+    calls as ``callbacks_fired`` and each call's duration is recorded under
+    ``handler_us.<event name>.<handler name>``, or under the pattern or
+    category in place of the event name for a group registration.
+    """
+    MODES = ("inline", "task", "thread")
+    OVERFLOW_POLICIES = ("drop_oldest", "latest")
+
+    def __init__(self, event_name: str, handler: Callable, on_error: Callable[[str, Callable, Exception], None],
+                 priority: int = 0, group: Optional[Tuple[str, str]] = None, change_only: bool = True,
+                 deadband: int = 0, max_rate: Optional[float] = None, mode: Optional[str] = None, queue_size: int = 16, overflow: str = "drop_oldest"):
+        is_coroutine = asyncio.iscoroutinefunction(handler)
+        mode = mode or ("task" if is_coroutine else "inline")
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        if is_coroutine and mode != "task":
+            raise ValueError("Coroutine handlers can only run in 'task' mode")
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {self.OVERFLOW_POLICIES}")
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        if deadband < 0:
+            raise ValueError("deadband must not be negative")
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError("max_rate must be positive")
+
+        self.event_name = event_name
+        self.handler = handler
+        self.priority = priority
+        self.group = group
+        self.change_only = change_only
+        self.deadband = deadband
+        self.max_rate = max_rate
+        self.mode = mode
+        self.dropped = 0
+        self.metrics: Optional[Metrics] = None
+        self._on_error = on_error
+        self._metric_name = f"handler_us.{group[1] if group else event_name}.{getattr(handler, '__qualname__', 'handler')}"
+        self._args: Tuple[Any, ...] = (event_name,) if group else ()
+        self._is_coroutine = is_coroutine
+        self._interval = 1.0 / max_rate if max_rate else 0.0
+        self._value: Any = _UNSET  # Latest value accepted, waiting for a rate-limited delivery
+        self._delivered: Any = _UNSET  # Last value handed to the handler
+        self._last_time = float('-inf')
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._queue: Deque[Any] = deque(maxlen=1 if overflow == "latest" else queue_size)
+        self._worker: Optional[asyncio.Task] = None
+
+    def offer(self, value: Any):
+        last = self._delivered
+        if last is not _UNSET:
+            if (self.change_only and value == last) or (
+                    self.deadband and isinstance(value, int) and isinstance(last, int) and abs(value - last) <= self.deadband):
+                if self._pending is not None:
+                    # Back to what the handler already has, nothing is left to deliver
+                    self._pending.cancel()
+                    self._pending = None
+                if self.metrics is not None:
+                    self.metrics.count('callbacks_suppressed')
+                return
+        self._value = value
+
+        if not self._interval:
+            self.dispatch(value)
+            return
+
+        if self._pending is not None:
+            # The pending delivery will pick up the latest value
+            if self.metrics is not None:
+                self.metrics.count('callbacks_suppressed')
+            return
+
+        delay = self._last_time + self._interval - time.monotonic()
+        if delay <= 0:
+            self._deliver()
+        else:
+            self._pending = asyncio.get_event_loop().call_later(delay, self._deliver)
+
+    def _deliver(self):
+        self._pending = None
+        self._last_time = time.monotonic()
+        self.dispatch(self._value)
+
+    def dispatch(self, value: Any):
+        """Hand a value to the handler, bypassing the filters."""
+        self._delivered = value
+        if self.mode == "inline":
+            self._call(value)
+            return
+
+        # Never block the receive path: a full queue drops its oldest value
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+            if self.metrics is not None:
+                self.metrics.count('callbacks_dropped')
+        self._queue.append(value)
+        if self._worker is None:
+            self._worker = asyncio.get_event_loop().create_task(self._drain())
+
+    def _call(self, value: Any):
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        try:
+            self.handler(*self._args, value)
+        except Exception as e:
+            self._on_error(self.event_name, self.handler, e)
+        if metrics is not None:
+            self._record(metrics, start)
+
+    def _record(self, metrics: Metrics, start: float):
+        metrics.count('callbacks_fired')
+        metrics.observe(self._metric_name, (time.perf_counter() - start) * 1e6)
+
+    async def _drain(self):
+        loop = asyncio.get_event_loop()
+        try:
+            while self._queue:
+                value = self._queue.popleft()
+                metrics = self.metrics
+                start = time.perf_counter() if metrics is not None else 0.0
+                try:
+                    if self._is_coroutine:
+                        await self.handler(*self._args, value)
+                    elif self.mode == "thread":
+                        await loop.run_in_executor(None, self.handler, *self._args, value)
+                    else:
+                        self.handler(*self._args, value)
+                except Exception as e:
+                    self._on_error(self.event_name, self.handler, e)
+                if metrics is not None:
+                    self._record(metrics, start)
+        finally:
+            self._worker = None
+
+    def reset(self):
+        """Cancel any pending rate-limited delivery and forget the last value."""
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        self._value = self._delivered = _UNSET
+        self._last_time = float('-inf')
+
+    def cancel(self):
+        """Reset, drop queued values and stop the worker."""
+        self.reset()
+        self._queue.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
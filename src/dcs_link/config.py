@@ -1,5 +1,7 @@
-
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from platform import system
 from typing import Optional
 
 @dataclass
@@ -8,12 +10,38 @@ class NetworkConfig:
     multicast_group: str = '239.255.50.10'
     loopback_interface: str = ""
     receive_port: int = 5010
+    receive_buffer_size: int = 0  # SO_RCVBUF in bytes, 0 keeps the OS default
     send_port: int = 7778
     call_port: int = 7790  # for insight
 
 @dataclass
 class LinkConfig:    
     json_dir: str = ""
+    cache_enable: bool = True
+    cache_dir: str = ""  # compiled JSON cache, platform cache directory if empty
     log_enable: bool = True
     log_level: int = 20  # INFO level
-    network: NetworkConfig = NetworkConfig()
\ No newline at end of file
+    receive_mode: str = "asyncio"  # "asyncio", "thread" to receive and decode on a dedicated thread, or "shared" to follow a hub
+    receive_ring_size: int = 256  # frames buffered between the receiver thread and the event loop
+    stay_connected: bool = False  # follow mission ends and aircraft changes instead of closing
+    aircraft_cache_size: int = 4  # aircraft whose control tables stay built for quick switching
+    shared_memory_publish: bool = False  # act as a hub, publishing the export memory for "shared" readers
+    shared_memory_name: str = "dcs_link"  # shared memory block of the hub
+    shared_memory_poll_interval: float = 0.005  # seconds between a reader's checks for a new frame
+    send_queue: bool = False  # batch commands per event loop iteration, coalescing intermediate positions
+    send_max_rate: float = 0  # queued commands per second per control, 0 for no limit
+    insight_max_in_flight: int = 32  # DCS-INSIGHT calls waiting for an answer at once
+    metrics_enable: bool = False  # counters and timing histograms, see metrics()
+    metrics_log_interval: float = 0  # seconds between metrics log lines, 0 to disable
+    network: NetworkConfig = field(default_factory=NetworkConfig)
+
+    def cache_path(self) -> str:
+        """Directory for cached data: ``cache_dir``, or the platform cache directory."""
+        if self.cache_dir:
+            return self.cache_dir
+
+        if system() == "Windows":
+            base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+        return os.path.join(base, "dcs_link")
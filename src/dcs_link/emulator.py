@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import string
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import NetworkConfig
+from .logger import Logger
+from .bios.loader import JsonLoader
+from .bios.memory import ExportMemory
+
+SYNC = b'\x55\x55\x55\x55'
+UPDATE_COUNTER_ADDRESS = 0xFFFE
+
+
+class BiosEmulator:
+    """Multicast synthetic DCS-BIOS export frames built from a JSON directory.
+
+    The first frame carries every output, including ``_ACFT_NAME``. Each
+    following frame changes a random ``change_density`` share of the outputs,
+    resends ``refresh_outputs`` unchanged ones in rotation as DCS-BIOS does and
+    bumps ``_UPDATE_COUNTER``. Commands received on the send port are counted,
+    and ``CONTROL value`` commands set integer outputs.
+
+    Args:
+        json_dir: DCS-BIOS JSON directory, as used by ``JsonLoader``
+        aircraft_name: Aircraft to emulate, the first one in the aliases if None
+        network: Multicast group and ports, the defaults match ``LinkConfig``
+        frame_rate: Frames sent per second
+        change_density: Share of the outputs changed in each frame, 0 to 1
+        refresh_outputs: Unchanged outputs resent per frame
+        seed: Random seed for repeatable streams
+        log_level: Logging level
+    """
+    def __init__(self, json_dir: str, aircraft_name: Optional[str] = None, network: Optional[NetworkConfig] = None,
+                 frame_rate: float = 30.0, change_density: float = 0.05, refresh_outputs: int = 32,
+                 seed: Optional[int] = None, log_level: int = 20):
+        if frame_rate <= 0:
+            raise ValueError("frame_rate must be positive")
+        if not 0 <= change_density <= 1:
+            raise ValueError("change_density must be between 0 and 1")
+
+        self.network = network or NetworkConfig()
+        self.frame_rate = frame_rate
+        self.change_density = change_density
+        self.refresh_outputs = refresh_outputs
+        self.frames = 0
+        self.commands = 0
+        self.memory = ExportMemory()
+        self._logger = Logger(self.__class__.__name__, log_level)
+        self._random = random.Random(seed)
+
+        loader = JsonLoader(json_dir)
+        loader.load_metadata()
+        if aircraft_name is None:
+            aircraft_name = next(iter(loader.aircraft), "")
+        loader.load_aircraft(aircraft_name)
+        self.aircraft_name = aircraft_name
+
+        # (identifier, output) for every integer and string output
+        self._outputs: List[Tuple[str, Dict[str, Any]]] = [
+            (identifier, output)
+            for identifier, control in loader.controls.items()
+            for output in control.get('outputs', [])
+            if output.get('type') in ('integer', 'string') and identifier != '_UPDATE_COUNTER'
+        ]
+        self._integers: Dict[str, Dict[str, Any]] = {
+            identifier: output for identifier, output in self._outputs if output.get('type') == 'integer'
+        }
+        self._refresh_index = 0
+        self._sock: Optional[socket.socket] = None
+        self._command_sock: Optional[socket.socket] = None
+        self._command_transport: Optional[asyncio.DatagramTransport] = None
+        self._task: Optional[asyncio.Task] = None
+
+        for identifier, output in self._outputs:
+            self._randomize(identifier, output)
+
+    def _randomize(self, identifier: str, output: Dict[str, Any]):
+        if output.get('type') == 'integer':
+            self._write_integer(output, self._random.randint(0, output.get('max_value', 0xFFFF)))
+        elif identifier == '_ACFT_NAME':
+            self._write_string(output, self.aircraft_name)
+        else:
+            length = self._random.randint(0, output.get('max_length', 1))
+            self._write_string(output, ''.join(self._random.choices(string.ascii_uppercase + string.digits, k=length)))
+
+    def _write_integer(self, output: Dict[str, Any], value: int):
+        address = output['address']
+        mask = output.get('mask', 0xFFFF)
+        word = self.memory.words[address >> 1]
+        self.memory.write_word(address, (word & ~mask & 0xFFFF) | ((value << output.get('shift_by', 0)) & mask))
+
+    def _write_string(self, output: Dict[str, Any], value: str):
+        length = output.get('max_length', 1)
+        self.memory.write_bytes(output['address'], value.encode('utf-8')[:length].ljust(length, b' '))
+
+    def set_value(self, identifier: str, value: int) -> bool:
+        """Set an integer output, clamped to its range; False if there is none."""
+        output = self._integers.get(identifier)
+        if output is None:
+            return False
+        self._write_integer(output, max(0, min(value, output.get('max_value', 0xFFFF))))
+        return True
+
+    def _refresh(self, output: Dict[str, Any]):
+        address = output['address']
+        end = address + (output.get('max_length', 1) if output.get('type') == 'string' else 2)
+        self.memory.write_bytes(address, bytes(self.memory.buffer[address:end]))
+
+    def step(self) -> bytes:
+        """Advance the emulated cockpit by one frame and return its datagram."""
+        if self.frames:
+            outputs = self._outputs
+            for identifier, output in self._random.sample(outputs, round(len(outputs) * self.change_density)):
+                self._randomize(identifier, output)
+
+            for _ in range(min(self.refresh_outputs, len(outputs))):
+                self._refresh(outputs[self._refresh_index][1])
+                self._refresh_index = (self._refresh_index + 1) % len(outputs)
+
+        self.memory.write_word(UPDATE_COUNTER_ADDRESS, self.frames & 0xFF)
+        self.frames += 1
+        return self.build_frame(self.memory.take_dirty())
+
+    def build_frame(self, ranges: List[Tuple[int, int]]) -> bytes:
+        """Encode word-aligned write blocks for the given byte ranges after a sync."""
+        frame = bytearray(SYNC)
+        buffer = self.memory.buffer
+        for start, end in ranges:
+            start &= ~1
+            end = min((end + 1) & ~1, ExportMemory.SIZE)
+            frame += start.to_bytes(2, 'little') + (end - start).to_bytes(2, 'little')
+            frame += buffer[start:end]
+        return bytes(frame)
+
+    async def start(self):
+        """Open the sockets and start sending frames."""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self._sock.setblocking(False)
+
+        loop = asyncio.get_event_loop()
+        self._command_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._command_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._command_sock.bind((self.network.server_ip, self.network.send_port))
+        self._command_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _CommandProtocol(self._on_command), sock=self._command_sock
+        )
+
+        self._task = loop.create_task(self._run())
+        self._logger.info(f"Emulating {self.aircraft_name or 'no aircraft'}: {len(self._outputs)} outputs "
+                          f"at {self.frame_rate:g} frames/s to {self.network.multicast_group}:{self.network.receive_port}")
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        interval = 1.0 / self.frame_rate
+        target = (self.network.multicast_group, self.network.receive_port)
+        due = loop.time()
+        while True:
+            try:
+                self._sock.sendto(self.step(), target)
+            except (BlockingIOError, InterruptedError):
+                pass  # Like DCS, drop the frame rather than fall behind
+            except OSError as e:
+                self._logger.error(f"Send failed: {e}")
+
+            # Schedule against the start time so frames don't drift
+            due += interval
+            delay = due - loop.time()
+            if delay < -interval:
+                due = loop.time()  # Too far behind, skip the lost frames
+            await asyncio.sleep(max(delay, 0))
+
+    def _on_command(self, data: bytes):
+        for line in data.decode('utf-8', errors='ignore').splitlines():
+            parts = line.split()
+            if not parts:
+                continue
+            self.commands += 1
+            if len(parts) == 2 and parts[1].isdigit():
+                self.set_value(parts[0], int(parts[1]))
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._command_transport:
+            # The transport owns the command socket and unregisters it from the loop
+            self._command_transport.close()
+            self._command_transport = None
+        elif self._command_sock:
+            self._command_sock.close()
+        if self._sock:
+            self._sock.close()
+        self._sock = self._command_sock = None
+
+
+class _CommandProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_command: Callable[[bytes], None]):
+        self._on_command = on_command
+
+    def datagram_received(self, data: bytes, addr):
+        self._on_command(data)
+
+
+class InsightEmulator:
+    """Serve a DCS-INSIGHT compatible TCP endpoint.
+
+    ``SENDAPI`` answers with the API catalogue; calls are answered in order
+    after ``latency`` seconds plus up to ``jitter`` seconds, and APIs that do
+    not return data get no answer, like DCS-INSIGHT.
+
+    Args:
+        network: Address and call port to listen on, the defaults match ``LinkConfig``
+        latency: Seconds before a call is answered
+        jitter: Random extra delay in seconds added to each answer
+        apis: API catalogue to serve, ``DEFAULT_APIS`` if None
+        seed: Random seed for repeatable results
+        log_level: Logging level
+    """
+    DEFAULT_APIS: List[Dict[str, Any]] = [
+        {"id": 0, "returns_data": False, "api_syntax": "GetDevice(device_id):performClickableAction(command_id, argument)",
+         "parameter_count": 3, "parameter_defs": [
+             {"id": 0, "name": "device_id", "type": 0},
+             {"id": 1, "name": "command_id", "type": 0},
+             {"id": 2, "name": "argument", "type": 0}]},
+        {"id": 1, "returns_data": True, "api_syntax": "GetDevice(device_id):get_argument_value(argument_id)",
+         "parameter_count": 2, "parameter_defs": [
+             {"id": 0, "name": "device_id", "type": 0},
+             {"id": 1, "name": "argument_id", "type": 0}]},
+        {"id": 2, "returns_data": True, "api_syntax": "list_indication(indicator_id)",
+         "parameter_count": 1, "parameter_defs": [
+             {"id": 0, "name": "indicator_id", "type": 0}]},
+        {"id": 3, "returns_data": True, "api_syntax": "LoGetModelTime()", "parameter_count": 0, "parameter_defs": []},
+        {"id": 4, "returns_data": True, "api_syntax": "LoGetSelfData()", "parameter_count": 0, "parameter_defs": []},
+    ]
+
+    def __init__(self, network: Optional[NetworkConfig] = None, latency: float = 0.0, jitter: float = 0.0,
+                 apis: Optional[List[Dict[str, Any]]] = None, seed: Optional[int] = None, log_level: int = 20):
+        if latency < 0 or jitter < 0:
+            raise ValueError("latency and jitter must not be negative")
+
+        self.network = network or NetworkConfig()
+        self.latency = latency
+        self.jitter = jitter
+        self.apis = apis if apis is not None else self.DEFAULT_APIS
+        self.calls = 0
+        self._logger = Logger(self.__class__.__name__, log_level)
+        self._random = random.Random(seed)
+        self._started = time.monotonic()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start listening for DCS-INSIGHT clients."""
+        self._server = await asyncio.start_server(self._serve, self.network.server_ip, self.network.call_port)
+        self._logger.info(f"Serving DCS-INSIGHT on {self.network.server_ip}:{self.network.call_port}")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_event_loop()
+        answers: asyncio.Queue = asyncio.Queue()
+        sender = loop.create_task(self._send_answers(answers, writer))
+        last_due = 0.0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+
+                answer = self._answer(line)
+                if answer is None:
+                    continue
+                # Answers keep the order of the calls even with jitter
+                last_due = max(loop.time() + self.latency + self._random.uniform(0, self.jitter), last_due)
+                answers.put_nowait((last_due, answer))
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.CancelledError):
+            pass  # Client gone, or the loop is shutting down
+        finally:
+            sender.cancel()
+            writer.close()
+
+    async def _send_answers(self, answers: asyncio.Queue, writer: asyncio.StreamWriter):
+        loop = asyncio.get_event_loop()
+        while True:
+            due, answer = await answers.get()
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            writer.write(answer)
+            await writer.drain()
+
+    def _answer(self, line: bytes) -> Optional[bytes]:
+        if line == b"SENDAPI":
+            return (json.dumps(self.apis) + "\n").encode('utf-8')
+
+        try:
+            call = json.loads(line)
+        except ValueError:
+            self._logger.warning(f"Malformed call: {line[:80]!r}")
+            return None
+
+        self.calls += 1
+        if not call.get("returns_data", False):
+            return None
+
+        call["result"] = self._result(call.get("api_syntax", ""), {
+            p.get("name"): p.get("value") for p in call.get("parameter_defs", [])
+        })
+        return (json.dumps(call) + "\n").encode('utf-8')
+
+    def _result(self, api_syntax: str, params: Dict[str, Any]) -> Any:
+        if api_syntax == "LoGetModelTime()":
+            return str(round(time.monotonic() - self._started, 3))
+        if api_syntax == "LoGetSelfData()":
+            return json.dumps({"Name": "Emulator", "LatLongAlt": {"Lat": 41.6, "Long": 41.6, "Alt": 1000.0}})
+        if api_syntax == "list_indication(indicator_id)":
+            return f"-----------------------------------------\nindicator {params.get('indicator_id')}\n"
+        if api_syntax.endswith("get_argument_value(argument_id)"):
+            return str(round(self._random.random(), 4))
+        return str(self._random.randint(0, 65535))
+
+    def close(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+
+
+async def _run(args: argparse.Namespace):
+    network = NetworkConfig(server_ip=args.server_ip)
+    bios = BiosEmulator(args.json_dir, args.aircraft, network, args.rate, args.density, seed=args.seed)
+    insight = InsightEmulator(network, args.latency, args.jitter, seed=args.seed)
+    await bios.start()
+    await insight.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        bios.close()
+        insight.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate DCS-BIOS and DCS-INSIGHT for load testing.")
+    parser.add_argument("json_dir", help="DCS-BIOS JSON directory")
+    parser.add_argument("--aircraft", help="aircraft to emulate, the first one in the aliases by default")
+    parser.add_argument("--rate", type=float, default=30.0, help="frames per second")
+    parser.add_argument("--density", type=float, default=0.05, help="share of the outputs changed per frame")
+    parser.add_argument("--latency", type=float, default=0.0, help="DCS-INSIGHT answer delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra DCS-INSIGHT delay in seconds")
+    parser.add_argument("--server-ip", default=NetworkConfig.server_ip, help="address for commands and DCS-INSIGHT")
+    parser.add_argument("--seed", type=int, help="random seed for repeatable streams")
+    try:
+        asyncio.run(_run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
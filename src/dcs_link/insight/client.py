@@ -1,42 +1,108 @@
 import asyncio
 import json
+import os
 import socket
-from typing import Optional, Any
+import time
+from collections import deque
+from typing import Optional, Any, Callable, Deque, Dict, List, Tuple
+from ..bios.subscription import Subscription
 from ..config import LinkConfig
 from ..logger import Logger
+from ..metrics import Metrics, log_metrics
+from .poller import CallKey, Poll, Poller, call_key
+from .template import CallTemplate
 
 class InsightClient:
+    """Client for DCS-INSIGHT API calls over one TCP connection.
+
+    DCS-INSIGHT answers calls in the order it received them and only answers
+    APIs that return data, so calls are pipelined: each call that expects an
+    answer queues a future in send order, and every answer resolves the oldest
+    one. At most ``insight_max_in_flight`` such calls wait for answers at once.
+
+    Calls registered with ``on`` are polled by a scheduler, and their results
+    are cached for the poll interval; ``call`` answers from that cache while
+    the result is fresh.
+
+    The API catalogue is kept in the cache directory per server, so a later
+    ``connect`` can use it at once while ``SENDAPI`` refreshes it. Every API
+    is compiled into a ``CallTemplate`` when the catalogue arrives.
+    """
+    MAX_MESSAGE_SIZE = 1 << 22  # Bytes an unfinished JSON document may span before it is dropped
+
     def __init__(self, config: LinkConfig):
         self._config = config
         self._logger = Logger(self.__class__.__name__, self._config.log_level if self._config.log_enable else 50)
 
         self._call_sock: Optional[socket.socket] = None
+        self._listen_task: Optional[asyncio.Task] = None
         self._received = asyncio.Event()
         self._running = False
-        self._buffer = ""
+        self._buffer = bytearray()
+        self._scanned = 0  # Bytes of the buffer already searched for a newline
+        self._decoder = json.JSONDecoder()
         self._apis: dict[str, dict] = {}
-        self._response: Any = None
+        self._templates: Dict[str, CallTemplate] = {}
+        self._catalogue: Optional[List[Dict[str, Any]]] = None
+        self._catalogue_path = os.path.join(
+            self._config.cache_path(), "insight",
+            f"apis-{self._config.network.server_ip}-{self._config.network.call_port}.json"
+        ) if self._config.cache_enable else None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._in_flight = asyncio.Semaphore(self._config.insight_max_in_flight)
+        self._send_lock = asyncio.Lock()
+        self._poller = Poller(self._request, self._cache_result)
+        self._cache: Dict[CallKey, Tuple[float, Any]] = {}  # expiry in loop time, result
+        self._metrics: Optional[Metrics] = Metrics() if self._config.metrics_enable else None
+        self._metrics_task: Optional[asyncio.Task] = None
 
         self._logger.info("Waiting for Connection")
 
     async def connect(self, timeout: Optional[float] = None) -> bool:
         """Establish connection to DCS-INSIGHT.
+
+        With a cached API catalogue the client is usable as soon as the
+        connection is open; the catalogue is refreshed in the background.
         
         Args:
             timeout: Time to wait for connection before considering connection failed, None for no timeout
         """
+        loop = asyncio.get_event_loop()
+        if not self._apis and self._catalogue_path:
+            apis = await loop.run_in_executor(None, self._read_catalogue)
+            if apis:
+                self._set_apis(apis)
+
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((self._config.network.server_ip, self._config.network.call_port))
+        sock.setblocking(False)  # sock_recv must not block the event loop
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (self._config.network.server_ip, self._config.network.call_port)), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            sock.close()
+            self._logger.error(f"Connection to DCS-INSIGHT failed: {e or 'timed out'}")
+            return False
         self._call_sock = sock
         self._running = True
+        self._buffer.clear()
+        self._scanned = 0
+        if self._metrics is not None and self._config.metrics_log_interval > 0 and not self._metrics_task:
+            self._metrics_task = asyncio.create_task(
+                log_metrics(self._logger, self.metrics, self._config.metrics_log_interval)
+            )
 
-        asyncio.create_task(self._listen_loop())
-        sock.send(b"SENDAPI\n")
+        self._received.clear()
+        self._listen_task = asyncio.create_task(self._listen_loop())
+        await loop.sock_sendall(sock, b"SENDAPI\n")
+        if self._apis:
+            self._logger.info("Connected to DCS-INSIGHT, using the cached API catalogue")
+            self._poller.start()
+            return True
 
         try:
             await asyncio.wait_for(self._received.wait(), timeout)
             self._received.clear()
             self._logger.info("Connected to DCS-INSIGHT")
+            self._poller.start()
             return True
         except asyncio.TimeoutError:
             self._logger.error("Connection to DCS-INSIGHT timed out")
@@ -45,64 +111,177 @@ class InsightClient:
 
     async def call(self, command: str, timeout: float = 5.0, **kwargs) -> Optional[str]:
         """Call an API.
+
+        Many calls can be awaited concurrently, e.g. with ``asyncio.gather``;
+        they share the connection and each gets its own result. A call that is
+        also polled with ``on`` returns the cached result while it is fresh.
         
         Args:
             command: The name of the API to call.
             timeout: The timeout for response.
             **kwargs: The parameters to pass to the API.
         """
+        if self._cache:
+            entry = self._cache.get(call_key(command, kwargs))
+            if entry is not None and entry[0] > asyncio.get_event_loop().time():
+                if self._metrics is not None:
+                    self._metrics.count('cache_hits')
+                return entry[1]
+
+        return await self._request(command, timeout, kwargs)
+
+    async def _request(self, command: str, timeout: float, kwargs: Dict[str, Any]) -> Optional[str]:
         if not self._running or self._call_sock is None:
             self._logger.error("Not connected. Call connect() first.")
             return None
 
-        api_def = self._apis.get(command)
-        if not api_def:
+        template = self._templates.get(command)
+        if template is None:
             self._logger.error(f"API not found: {command}")
             return None
 
-        param_defs = api_def["parameter_defs"]
-        expected = {p["name"] for p in param_defs}
-        provided = set(kwargs)
-
-        if provided != expected:
-            msg = f"Parameter mismatch for {command}."
-            if missing := expected - provided:
-                msg += f" Missing: {missing}."
-            if extra := provided - expected:
-                msg += f" Unexpected: {extra}."
-            self._logger.error(msg)
+        mismatch = template.mismatch(kwargs)
+        if mismatch:
+            self._logger.error(mismatch)
             return None
 
-        call_obj = {
-            **api_def,
-            "parameter_defs": [
-                {
-                    "id": p["id"],
-                    "name": p["name"],
-                    "value": str(kwargs[p["name"]]),
-                    "type": p["type"]
-                }
-                for p in param_defs
-            ]
-        }
-
-        payload = (json.dumps(call_obj, ensure_ascii=False) + "\n").encode("utf-8")
+        payload = template.render(kwargs)
+        if not template.returns_data:
+            await self._send(payload)
+            return None
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        try:
+            await asyncio.wait_for(self._in_flight.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return self._timed_out(command)
+
+        try:
+            future = loop.create_future()
+            start = time.perf_counter()
+            if not await self._send(payload, future):
+                return None
+
+            try:
+                # A timed out future keeps its place in the queue, so the
+                # late answer is still matched to it and then discarded
+                result = await asyncio.wait_for(future, max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                return self._timed_out(command)
+            except ConnectionError as e:
+                if self._running:
+                    self._logger.error(f"Call to {command} failed: {e}")
+                return None
+
+            if self._metrics is not None:
+                self._metrics.observe('call_latency_us', (time.perf_counter() - start) * 1e6)
+            return result
+        finally:
+            self._in_flight.release()
+
+    async def _send(self, payload: bytes, future: Optional[asyncio.Future] = None) -> bool:
+        """Send one call; ``future`` is queued for its answer in send order."""
+        metrics = self._metrics
+        sock = self._call_sock
+        if sock is None:
+            return False
+
         try:
-            self._call_sock.send(payload)
+            sent = 0
+            if not self._send_lock.locked():
+                # Nobody is waiting to send, so the call can go out right away
+                try:
+                    sent = sock.send(payload)
+                except BlockingIOError:
+                    pass
+                if sent == len(payload):
+                    if future is not None:
+                        self._pending.append(future)
+                    if metrics is not None:
+                        metrics.count('calls')
+                    return True
+
+            # Calls must reach the socket whole and in the order of their futures;
+            # after a partial send the lock is free, so the rest goes next
+            async with self._send_lock:
+                if self._call_sock is None:
+                    return False
+                if future is not None:
+                    self._pending.append(future)
+                await asyncio.get_event_loop().sock_sendall(self._call_sock, payload[sent:])
         except OSError as e:
+            if metrics is not None:
+                metrics.count('call_errors')
             self._logger.error(f"Send failed: {e}")
-            return None
+            if future is not None and not future.done():
+                future.cancel()
+            return False
 
-        if not api_def.get("returns_data", False):
-            return None
+        if metrics is not None:
+            metrics.count('calls')
+        return True
 
-        try:
-            await asyncio.wait_for(self._received.wait(), timeout)
-            self._received.clear()
-            return self._response
-        except asyncio.TimeoutError:
-            self._logger.warning(f"Call to {command} timed out")
-            return None
+    def on(self, command: str, handler: Callable, interval: float = 1.0, **kwargs):
+        """Poll an API periodically and pass every result to a handler.
+
+        Handlers of the same command and parameters share one poll, run at the
+        shortest interval any of them asked for. Results stay in the cache for
+        that interval, so ``call`` returns them without a round trip.
+        
+        Args:
+            command: The name of the API to call.
+            handler: Function or coroutine function called with each result.
+            interval: Seconds between calls.
+            **kwargs: The parameters to pass to the API.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        self._poller.add(command, kwargs, Subscription(command, handler, self._handler_error, change_only=False), interval)
+        if self._running:
+            self._poller.start()
+        self._logger.debug(f"Polling {command} every {interval}s")
+
+    def off(self, command: str, handler: Optional[Callable] = None, **kwargs):
+        """Stop polling an API for one handler, or for all of them.
+        
+        Args:
+            command: The name of the polled API.
+            handler: Handler to remove, None for all handlers of the call.
+            **kwargs: The parameters the API is polled with.
+        """
+        self._poller.remove(command, kwargs, handler)
+        key = call_key(command, kwargs)
+        if key not in self._poller.polls:
+            self._cache.pop(key, None)
+
+    def _cache_result(self, poll: Poll, result: Any):
+        self._cache[poll.key] = (asyncio.get_event_loop().time() + poll.interval, result)
+
+    def _handler_error(self, command: str, handler: Callable, e: Exception):
+        self._logger.error(f"Error in poll of {command}: {getattr(handler, '__name__', handler)} - {e}")
+
+    def _timed_out(self, command: str) -> None:
+        if self._metrics is not None:
+            self._metrics.count('call_timeouts')
+        self._logger.warning(f"Call to {command} timed out")
+        return None
+
+    def metrics(self, reset: bool = False) -> Dict[str, Any]:
+        """Return a snapshot of the call counters and latency histogram in
+        microseconds, empty unless ``metrics_enable`` is set.
+        
+        Args:
+            reset: Start counting from zero again after taking the snapshot
+        """
+        if self._metrics is None:
+            return {}
+
+        snapshot = self._metrics.snapshot()
+        if reset:
+            self._metrics.reset()
+        return snapshot
 
     @property
     def apis(self) -> set[str]:
@@ -114,32 +293,112 @@ class InsightClient:
     async def _listen_loop(self):
         self._logger.debug("Starting listen loop")
         loop = asyncio.get_event_loop()
+        chunk = memoryview(bytearray(65536))
         while self._running:
             try:
-                data = await loop.sock_recv(self._call_sock, 65536)
-                if not data:
+                size = await loop.sock_recv_into(self._call_sock, chunk)
+                if not size:
                     break
-                self._process_buffer(data)
+                self._process_buffer(chunk[:size])
             except Exception as e:
                 if self._running:
                     self._logger.error(f"Listen loop error: {e}")
                 break
+        self._fail_pending()
+
+    def _fail_pending(self):
+        pending, self._pending = self._pending, deque()
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError("Connection to DCS-INSIGHT closed"))
 
     def _process_buffer(self, data: bytes):
-        self._buffer += data.decode('utf-8')
-        while self._buffer.strip():
+        """Append received bytes and handle every complete message.
+
+        Messages end with a newline. Only the new bytes are searched for one,
+        and a line is decoded only once it is complete, so a multi-byte UTF-8
+        character split across reads is decoded whole. A line that starts an
+        unfinished JSON object or array, as with pretty-printed output, is kept
+        and decoded again together with the next line, up to
+        ``MAX_MESSAGE_SIZE`` bytes. Any other malformed line is dropped, and
+        when lines merged this way fail to decode the earlier ones are dropped
+        and the last is decoded on its own, so the next answer is not lost.
+        """
+        buffer = self._buffer
+        buffer += data
+        start = 0
+        while True:
+            end = buffer.find(b"\n", self._scanned)
+            if end < 0:
+                self._scanned = len(buffer)
+                break
+            self._scanned = end + 1
+
+            text = buffer[start:end].decode('utf-8', errors='replace').strip()
+            if not text:
+                start = self._scanned
+                continue
             try:
-                obj, end = json.JSONDecoder().raw_decode(self._buffer)
-                self._buffer = self._buffer[end:].lstrip()
-
-                if isinstance(obj, list):
-                    self._apis = {d["api_syntax"]: d for d in obj}
-                    self._received.set()
-                elif isinstance(obj, dict):
-                    self._response = obj.get("result")
-                    self._received.set()
-            except json.JSONDecodeError:
-                break  # Incomplete message, wait for more data
+                obj = self._decoder.decode(text)
+            except json.JSONDecodeError as e:
+                if e.pos >= len(text) and text[0] in '{[' and end - start < self.MAX_MESSAGE_SIZE:
+                    continue  # The document goes on in the next line
+                self._logger.error(f"Malformed message from DCS-INSIGHT: {e}")
+                last = buffer.rfind(b"\n", start, end)
+                if last >= 0:
+                    # Resync on the last line, which may be a complete message
+                    start = self._scanned = last + 1
+                else:
+                    start = self._scanned
+                continue
+
+            start = self._scanned
+            self._handle_message(obj)
+
+        if start:
+            del buffer[:start]
+            self._scanned -= start
+
+    def _handle_message(self, obj: Any):
+        if isinstance(obj, list):
+            changed = obj != self._catalogue
+            self._set_apis(obj)
+            self._received.set()
+            if changed and self._catalogue_path:
+                asyncio.get_event_loop().run_in_executor(None, self._write_catalogue, obj)
+        elif isinstance(obj, dict) and self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_result(obj.get("result"))
+
+    def _set_apis(self, apis: List[Dict[str, Any]]):
+        templates = {}
+        for api_def in apis:
+            try:
+                templates[api_def["api_syntax"]] = CallTemplate(api_def)
+            except (KeyError, TypeError, AttributeError) as e:
+                self._logger.warning(f"Skipping malformed API definition: {e}")
+        self._apis = {command: template.api_def for command, template in templates.items()}
+        self._templates = templates
+        self._catalogue = apis
+
+    def _read_catalogue(self) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._catalogue_path, 'r', encoding='utf-8') as f:
+                apis = json.load(f)
+            return apis if isinstance(apis, list) else None
+        except (OSError, ValueError):
+            return None
+
+    def _write_catalogue(self, apis: List[Dict[str, Any]]):
+        try:
+            os.makedirs(os.path.dirname(self._catalogue_path), exist_ok=True)
+            tmp_path = f'{self._catalogue_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(apis, f, ensure_ascii=False)
+            os.replace(tmp_path, self._catalogue_path)
+        except OSError as e:
+            self._logger.debug(f"Could not cache the API catalogue: {e}")
 
     def close(self):
         """
@@ -147,6 +406,24 @@ class InsightClient:
         """
         self._logger.info("Closing connection")
         self._running = False
+        self._poller.stop()
+        self._cache.clear()
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        if self._listen_task:
+            if self._call_sock:
+                # Unregister the pending receive and send first, or the selector keeps
+                # the fd and a socket reusing its number fails to connect
+                loop = self._listen_task.get_loop()
+                try:
+                    loop.remove_reader(self._call_sock.fileno())
+                    loop.remove_writer(self._call_sock.fileno())
+                except NotImplementedError:
+                    pass  # Proactor loops have no readers to remove
+            self._listen_task.cancel()
+            self._listen_task = None
         if self._call_sock:
             self._call_sock.close()
-            self._call_sock = None
\ No newline at end of file
+            self._call_sock = None
+        self._fail_pending()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..bios.subscription import Subscription
+
+# (command, ((parameter, value as sent), ...)), identifies one distinct call
+CallKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Fraction of the golden ratio; successive polls start at well spread phases
+_PHASE_STEP = 0.6180339887
+
+
+def call_key(command: str, kwargs: Dict[str, Any]) -> CallKey:
+    return command, tuple(sorted((name, str(value)) for name, value in kwargs.items()))
+
+
+class Poll:
+    """One API call polled on behalf of every handler subscribed to it.
+
+    The call runs at the shortest interval any of its handlers asked for, and
+    its result stays fresh in the cache for that interval.
+
+    Args:
+        command: API to call
+        kwargs: Parameters of the call
+        phase: Fraction of the interval to wait before the first call, 0 to 1
+    """
+    def __init__(self, command: str, kwargs: Dict[str, Any], phase: float):
+        self.command = command
+        self.kwargs = kwargs
+        self.key = call_key(command, kwargs)
+        self.phase = phase
+        self.next_due = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.subscriptions: Dict[Callable, Tuple[float, Subscription]] = {}
+
+    @property
+    def interval(self) -> float:
+        return min(interval for interval, _ in self.subscriptions.values())
+
+    def schedule(self, now: float):
+        self.next_due = now + self.interval * self.phase
+
+    def publish(self, result: Any):
+        for _, subscription in list(self.subscriptions.values()):
+            subscription.dispatch(result)
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        for _, subscription in self.subscriptions.values():
+            subscription.cancel()
+
+
+class Poller:
+    """Run the polls of an ``InsightClient`` from a single scheduler task.
+
+    Identical ``(command, kwargs)`` subscriptions share one ``Poll``. Each new
+    poll starts at a different phase of its interval so polls added together
+    do not fire in bursts, and a poll whose previous call is still waiting for
+    an answer skips its turn instead of piling up calls.
+
+    Args:
+        call: Coroutine function making the actual call, ``(command, timeout, kwargs)``
+        on_result: Called with the poll and its result after every successful call
+    """
+    def __init__(self, call: Callable, on_result: Callable[[Poll, Any], None]):
+        self.polls: Dict[CallKey, Poll] = {}
+        self._call = call
+        self._on_result = on_result
+        self._count = 0
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, command: str, kwargs: Dict[str, Any], subscription: Subscription, interval: float):
+        key = call_key(command, kwargs)
+        poll = self.polls.get(key)
+        loop = asyncio.get_event_loop()
+        if poll is None:
+            poll = self.polls[key] = Poll(command, dict(kwargs), (self._count * _PHASE_STEP) % 1.0)
+            self._count += 1
+            poll.subscriptions[subscription.handler] = (interval, subscription)
+            poll.schedule(loop.time())
+        else:
+            previous = poll.subscriptions.get(subscription.handler)
+            if previous:
+                previous[1].cancel()
+            poll.subscriptions[subscription.handler] = (interval, subscription)
+            poll.next_due = min(poll.next_due, loop.time() + poll.interval)
+        self._changed.set()
+
+    def remove(self, command: str, kwargs: Dict[str, Any], handler: Optional[Callable]):
+        key = call_key(command, kwargs)
+        poll = self.polls.get(key)
+        if poll is None:
+            return
+
+        for h in [h for h in poll.subscriptions if handler in (None, h)]:
+            poll.subscriptions.pop(h)[1].cancel()
+        if not poll.subscriptions:
+            poll.cancel()
+            del self.polls[key]
+        self._changed.set()
+
+    def start(self):
+        if self._task is None:
+            loop = asyncio.get_event_loop()
+            now = loop.time()
+            for poll in self.polls.values():
+                poll.schedule(now)
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            now = loop.time()
+            wait: Optional[float] = None
+            for poll in list(self.polls.values()):
+                if poll.next_due <= now:
+                    interval = poll.interval
+                    # Stay on the poll's phase unless it fell a whole interval behind
+                    poll.next_due += interval
+                    if poll.next_due <= now:
+                        poll.next_due = now + interval
+                    if poll.task is None:
+                        poll.task = loop.create_task(self._poll(poll, interval))
+                delay = poll.next_due - now
+                wait = delay if wait is None else min(wait, delay)
+
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, poll: Poll, interval: float):
+        try:
+            result = await self._call(poll.command, interval, poll.kwargs)
+            if result is not None:
+                self._on_result(poll, result)
+                poll.publish(result)
+        finally:
+            poll.task = None
+
+    def stop(self):
+        """Stop the scheduler and every call in progress, keeping the subscriptions."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for poll in self.polls.values():
+            if poll.task is not None:
+                poll.task.cancel()
+                poll.task = None
@@ -0,0 +1,68 @@
+import json
+from json.encoder import encode_basestring
+from typing import Any, Dict, List, Optional, Tuple
+
+_PLACEHOLDER = "\x01DCSLINK{}\x01"
+
+
+class CallTemplate:
+    """Precompiled request of one DCS-INSIGHT API.
+
+    The API definition is serialized once with a placeholder for every
+    parameter value and split around them, so a call only validates the
+    parameter names and joins the encoded values in. The payload of an API
+    without parameters is built once.
+
+    Args:
+        api_def: API definition from the ``SENDAPI`` catalogue
+    """
+    __slots__ = ('api_def', 'command', 'names', 'returns_data', '_order', '_parts', '_payload')
+
+    def __init__(self, api_def: Dict[str, Any]):
+        param_defs = api_def.get("parameter_defs", [])
+        self.api_def = api_def
+        self.command: str = api_def["api_syntax"]
+        self.names = frozenset(p["name"] for p in param_defs)
+        self.returns_data: bool = bool(api_def.get("returns_data", False))
+        self._order: Tuple[str, ...] = tuple(p["name"] for p in param_defs)
+
+        call_obj = {
+            **api_def,
+            "parameter_defs": [
+                {"id": p["id"], "name": p["name"], "value": _PLACEHOLDER.format(i), "type": p["type"]}
+                for i, p in enumerate(param_defs)
+            ]
+        }
+        text = json.dumps(call_obj, ensure_ascii=False) + "\n"
+        parts: List[str] = []
+        for i in range(len(param_defs)):
+            head, text = text.split(json.dumps(_PLACEHOLDER.format(i), ensure_ascii=False), 1)
+            parts.append(head)
+        parts.append(text)
+        self._parts = tuple(parts)
+        self._payload: Optional[bytes] = parts[0].encode("utf-8") if not param_defs else None
+
+    def mismatch(self, kwargs: Dict[str, Any]) -> Optional[str]:
+        """Describe how ``kwargs`` differ from the API's parameters, None if they match."""
+        if kwargs.keys() == self.names:
+            return None
+
+        provided = set(kwargs)
+        msg = f"Parameter mismatch for {self.command}."
+        if missing := self.names - provided:
+            msg += f" Missing: {set(missing)}."
+        if extra := provided - self.names:
+            msg += f" Unexpected: {extra}."
+        return msg
+
+    def render(self, kwargs: Dict[str, Any]) -> bytes:
+        """Return the request line for matching ``kwargs``; values are sent as strings."""
+        if self._payload is not None:
+            return self._payload
+
+        parts = self._parts
+        pieces = [parts[0]]
+        for i, name in enumerate(self._order, 1):
+            pieces.append(encode_basestring(str(kwargs[name])))
+            pieces.append(parts[i])
+        return "".join(pieces).encode("utf-8")
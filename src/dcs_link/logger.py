@@ -34,6 +34,9 @@ class Logger():
             handler.setFormatter(formatter)
             self.logger.addHandler(handler)
     
+    def enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
     def debug(self, message: str): 
         self.logger.debug(message)
     
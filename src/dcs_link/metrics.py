@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, Callable, Dict, List
+
+
+class Histogram:
+    """Histogram of non-negative values in power-of-two buckets.
+
+    ``add`` is a handful of integer operations, so it can sit on the receive
+    path. Percentiles are reported as the upper bound of their bucket, capped
+    at the largest value seen.
+    """
+    BUCKETS = 40
+
+    __slots__ = ('count', 'total', 'min', 'max', '_buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self._buckets: List[int] = [0] * self.BUCKETS
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._buckets[min(int(value).bit_length(), self.BUCKETS - 1)] += 1
+
+    def merge(self, other: 'Histogram'):
+        """Add the values counted by another histogram."""
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._buckets = [a + b for a, b in zip(self._buckets, other._buckets)]
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self._buckets):
+            seen += n
+            if seen >= rank and n:
+                return round(min(1 << index, self.max), 1)
+        return round(self.max, 1)
+
+    def snapshot(self) -> Dict[str, float]:
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 1),
+            'min': round(self.min, 1),
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 1),
+        }
+
+
+class Metrics:
+    """Counters and histograms kept by a client when metrics are enabled.
+
+    Clients hold ``None`` instead of a ``Metrics`` when they are disabled, so
+    the receive path pays one ``is None`` check. Histogram names end in the
+    unit of their values, ``_us`` for microseconds.
+
+    A ``Metrics`` has no lock: each one is written by a single thread, and a
+    receiver thread keeps its own, merged into the client's with ``update``.
+    """
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(value)
+
+    def update(self, other: 'Metrics'):
+        """Add the counters and histograms of another ``Metrics``."""
+        for name, n in list(other.counters.items()):
+            self.count(name, n)
+        for name, other_histogram in list(other.histograms.items()):
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.merge(other_histogram)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'counters': dict(self.counters),
+            'histograms': {name: h.snapshot() for name, h in list(self.histograms.items())},
+        }
+
+    def reset(self):
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def summary(snapshot: Dict[str, Any]) -> str:
+        """Format a snapshot as one log line."""
+        parts = [f"{name}={value}" for name, value in sorted(snapshot['counters'].items())]
+        for name, h in sorted(snapshot['histograms'].items()):
+            if h['count']:
+                parts.append(f"{name}(n={h['count']} p50={h['p50']:g} p99={h['p99']:g} max={h['max']:g})")
+        return " ".join(parts) or "no activity"
+
+
+async def log_metrics(logger: Any, snapshot: Callable[[], Dict[str, Any]], interval: float):
+    """Log a metrics summary line every ``interval`` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"Metrics: {Metrics.summary(snapshot())}")
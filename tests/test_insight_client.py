@@ -0,0 +1,29 @@
+import asyncio
+
+from dcs_link.config import LinkConfig
+from dcs_link.insight.client import InsightClient
+
+
+def _answers(*chunks):
+    async def run():
+        client = InsightClient(LinkConfig(log_enable=False, cache_enable=False))
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in range(2)]
+        client._pending.extend(futures)
+        for chunk in chunks:
+            client._process_buffer(chunk)
+        return [future.result() if future.done() else None for future in futures]
+
+    return asyncio.run(run())
+
+
+def test_malformed_line_does_not_swallow_next_answer():
+    assert _answers(b'not json\n{"result": 2}\n') == [2, None]
+
+
+def test_unfinished_line_resyncs_on_next_answer():
+    assert _answers(b'{"result": 1\n{"result": 2}\n{"result": 3}\n') == [2, 3]
+
+
+def test_pretty_printed_answer_spans_lines():
+    assert _answers(b'{\n  "result": ', b'[1, 2]\n}\n{"result": 3}\n') == [[1, 2], 3]
@@ -0,0 +1,50 @@
+import asyncio
+
+from dcs_link.bios.subscription import Subscription
+
+
+def _raise(event_name, handler, error):
+    raise error
+
+
+def test_max_rate_drops_value_returning_to_delivered():
+    async def run():
+        received = []
+        subscription = Subscription("TEST", received.append, _raise, max_rate=20)
+        subscription.offer(1)  # Delivered at once
+        subscription.offer(2)  # Held for the next slot
+        subscription.offer(1)  # Back to the delivered value
+        await asyncio.sleep(0.1)
+        subscription.offer(2)
+        return received
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_max_rate_delivers_latest_value():
+    async def run():
+        received = []
+        subscription = Subscription("TEST", received.append, _raise, max_rate=20)
+        subscription.offer(1)
+        subscription.offer(2)
+        subscription.offer(3)
+        await asyncio.sleep(0.1)
+        return received
+
+    assert asyncio.run(run()) == [1, 3]
+
+
+def test_deadband_compares_with_delivered_value():
+    async def run():
+        received = []
+        subscription = Subscription("TEST", received.append, _raise, deadband=5, max_rate=20)
+        subscription.offer(100)
+        subscription.offer(110)  # Held for the next slot
+        subscription.offer(103)  # Within the deadband of 100 again
+        await asyncio.sleep(0.1)
+        subscription.offer(104)
+        subscription.offer(106)
+        await asyncio.sleep(0.1)
+        return received
+
+    assert asyncio.run(run()) == [100, 106]